@@ -1,26 +1,42 @@
 import random
 from quotes_data import quotes
-from quote_manager import get_random_quote, add_quote, remove_quote
-from user_interface import display_menu, get_user_choice, get_user_input
+from quote_manager import (
+    get_random_quote,
+    add_quote,
+    remove_quote,
+    search_quotes,
+    search_by_author,
+)
+from quote_scheduler import QuoteScheduler
+from search_index import QuoteIndex
+from user_interface import (
+    display_menu,
+    get_user_choice,
+    get_user_input,
+    display_quotes,
+)
 
 
 def main():
     print("Welcome to the Quote of the Day App!")
     print()
+    index = QuoteIndex(quotes)
+    scheduler = QuoteScheduler(quotes)
+    user = "default"
 
     while True:
         display_menu()
         choice = get_user_choice()
 
         if choice == 1:
-            quote = get_random_quote(quotes)
+            quote = get_random_quote(quotes, scheduler, user)
             print(f"Here is a random quote for you: {quote}")
             print()
         elif choice == 2:
             new_quote = get_user_input("Enter a new quote: ")
             author = get_user_input("Enter the author of the quote: ")
             print()
-            add_quote(quotes, new_quote, author)
+            add_quote(quotes, new_quote, author, index, scheduler)
             print("Quote added successfully!")
             print()
         elif choice == 3:
@@ -29,11 +45,23 @@ def main():
                 "Enter the author of the quote you want to remove: "
             )
             print()
-            result = remove_quote(quotes, quote_to_remove, author_to_remove)
+            result = remove_quote(
+                quotes, quote_to_remove, author_to_remove, index, scheduler
+            )
             if result is not None:
                 print("Quote removed successfully!")
             print()
         elif choice == 4:
+            query = get_user_input(
+                'Enter words to search for (wrap in "quotes" for a phrase): '
+            )
+            print()
+            display_quotes(search_quotes(index, query))
+        elif choice == 5:
+            author = get_user_input("Enter the author to search for: ")
+            print()
+            display_quotes(search_by_author(index, author))
+        elif choice == 6:
             print("Thank you for using the Quote of the Day App!")
             break
         else:
@@ -1,18 +1,38 @@
 import random
 
 
-def get_random_quote(quotes):
-    return random.choice(quotes)
+def get_random_quote(quotes, scheduler=None, user=None):
+    if scheduler is None:
+        return random.choice(quotes)
+    if user is None:
+        return scheduler.draw()
+    return scheduler.next_for_user(user)
 
 
-def add_quote(quotes, quote, author):
+def add_quote(quotes, quote, author, index=None, scheduler=None):
     quotes.append((quote, author))
+    if index is not None:
+        index.add(quote, author)
+    if scheduler is not None:
+        scheduler.quotes_changed()
 
 
-def remove_quote(quotes, quote_to_remove, author_to_remove):
-    for index, (quote, author) in enumerate(quotes):
+def remove_quote(quotes, quote_to_remove, author_to_remove, index=None, scheduler=None):
+    for position, (quote, author) in enumerate(quotes):
         if quote == quote_to_remove and author == author_to_remove:
-            return quotes.pop(index)
+            if index is not None:
+                index.remove(quote, author)
+            if scheduler is not None:
+                scheduler.quotes_changed()
+            return quotes.pop(position)
     print("Quote not found.")
     print()
     return None
+
+
+def search_quotes(index, query, limit=10):
+    return index.search(query, limit)
+
+
+def search_by_author(index, author, limit=10):
+    return index.search_author(author, limit)
@@ -0,0 +1,104 @@
+import random
+
+ROUNDS = 4  # Feistel rounds in each user's shuffle
+
+
+def shuffle(number, half_bits, round_keys):
+    # A Feistel network: a permutation of the numbers below 4**half_bits,
+    # different for every set of round keys
+    half_mask = (1 << half_bits) - 1
+    left, right = number >> half_bits, number & half_mask
+    for round_key in round_keys:
+        mixed = ((right ^ round_key) * 0x9E3779B1) & 0xFFFFFFFF
+        left, right = right, left ^ ((mixed >> 16) & half_mask)
+    return (left << half_bits) | right
+
+
+class QuoteScheduler:
+    def __init__(self, quotes, weights=None, rng=None):
+        self.quotes = quotes
+        self.weights = weights
+        self.rng = rng or random.Random()
+        self.size = -1
+        self.user_state = {}  # user -> (seed of their own order, draws so far)
+        self.rebuild()
+
+    def rebuild(self):
+        # Vose's alias method: O(n) to build, O(1) for every draw afterwards
+        count = len(self.quotes)
+        weights = self.weights or [1] * count
+        if len(weights) != count:
+            raise ValueError("There must be one weight per quote")
+        total = sum(weights)
+        if count and total <= 0:
+            raise ValueError("Weights must add up to a positive number")
+
+        self.probability = [0.0] * count
+        self.alias = [0] * count
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1]
+        large = [i for i, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        for i in small + large:
+            self.probability[i] = 1.0
+
+        # Each user gets their own order, worked out from a 64-bit seed on
+        # every draw, so no shuffled list is stored for anyone.
+        self.half_bits = (max(2, (count - 1).bit_length()) + 1) // 2
+        self.user_state.clear()
+        self.size = count
+
+    def set_weights(self, weights):
+        self.weights = weights
+        self.rebuild()
+
+    def quotes_changed(self):
+        # Called by add_quote and remove_quote, since a quote can be removed
+        # and another added without the count changing
+        self.size = -1
+
+    def check_size(self):
+        if len(self.quotes) != self.size:
+            if self.weights is not None:
+                # The weights are by position and may now belong to other quotes
+                raise ValueError(
+                    "The quotes changed since the weights were set, "
+                    "call set_weights with new weights"
+                )
+            self.rebuild()
+        if not self.quotes:
+            raise IndexError("There are no quotes to choose from")
+
+    def draw(self):
+        self.check_size()
+        column = self.rng.randrange(self.size)
+        if self.rng.random() < self.probability[column]:
+            return self.quotes[column]
+        return self.quotes[self.alias[column]]
+
+    def position_in_order(self, seed, draw):
+        # The quote a user with this seed sees on their draw-th turn. Results
+        # past the end are shuffled again ("cycle walking") until one fits;
+        # the shuffle covers less than four times the quotes, so this is quick.
+        round_keys = [(seed >> (16 * i)) & 0xFFFF for i in range(ROUNDS)]
+        position = shuffle(draw, self.half_bits, round_keys)
+        while position >= self.size:
+            position = shuffle(position, self.half_bits, round_keys)
+        return position
+
+    def next_for_user(self, user):
+        self.check_size()
+        seed, draws = self.user_state.get(user, (None, 0))
+        if seed is None or draws == self.size:
+            # A new round through the quotes, in a new order
+            seed, draws = self.rng.getrandbits(64), 0
+        self.user_state[user] = (seed, draws + 1)
+        return self.quotes[self.position_in_order(seed, draws)]
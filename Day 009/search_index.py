@@ -0,0 +1,165 @@
+import heapq
+import math
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class QuoteIndex:
+    # BM25 tuning constants
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, quotes=()):
+        self.next_id = 0
+        self.documents = {}  # quote ID -> (quote, author)
+        self.ids_by_quote = {}  # (quote, author) -> list of quote IDs
+        self.lengths = {}  # quote ID -> number of tokens
+        self.total_length = 0
+        self.postings = {}  # token -> {quote ID: [positions]}
+        # token -> (highest frequency, shortest length) over its quotes; only
+        # used to bound scores, so it is not tightened when quotes are removed
+        self.term_limits = {}
+        self.authors = {}  # author token -> set of quote IDs
+        for quote, author in quotes:
+            self.add(quote, author)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, quote, author):
+        quote_id = self.next_id
+        self.next_id += 1
+        self.documents[quote_id] = (quote, author)
+        self.ids_by_quote.setdefault((quote, author), []).append(quote_id)
+
+        tokens = tokenize(quote)
+        self.lengths[quote_id] = len(tokens)
+        self.total_length += len(tokens)
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(quote_id, []).append(
+                position
+            )
+        for token in set(tokens):
+            frequency = len(self.postings[token][quote_id])
+            highest, shortest = self.term_limits.get(token, (0, len(tokens)))
+            self.term_limits[token] = (
+                max(highest, frequency),
+                min(shortest, len(tokens)),
+            )
+        for token in tokenize(author):
+            self.authors.setdefault(token, set()).add(quote_id)
+        return quote_id
+
+    def remove(self, quote, author):
+        ids = self.ids_by_quote.get((quote, author))
+        if not ids:
+            return False
+        quote_id = ids.pop()
+        if not ids:
+            del self.ids_by_quote[(quote, author)]
+        del self.documents[quote_id]
+        self.total_length -= self.lengths.pop(quote_id)
+
+        for token in set(tokenize(quote)):
+            postings = self.postings[token]
+            del postings[quote_id]
+            if not postings:
+                del self.postings[token]
+                del self.term_limits[token]
+        for token in set(tokenize(author)):
+            matches = self.authors[token]
+            matches.discard(quote_id)
+            if not matches:
+                del self.authors[token]
+        return True
+
+    def search(self, query, limit=10):
+        query = query.strip()
+        if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+            return self.search_phrase(query[1:-1], limit)
+
+        tokens = tokenize(query)
+        if not tokens or not self.documents:
+            return []
+        count = len(self.documents)
+        average_length = self.total_length / count or 1
+
+        # Rarest tokens first, each with the most any quote can score from it
+        terms = []
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            frequency, shortest = self.term_limits[token]
+            norm = 1 - self.B + self.B * shortest / average_length
+            ceiling = idf * frequency * (self.K1 + 1) / (frequency + self.K1 * norm)
+            terms.append((idf, ceiling, postings))
+        terms.sort(key=lambda term: term[1], reverse=True)
+
+        # MaxScore: the lowest score in the top `limit` so far can only go up.
+        # Once the tokens still to come could not lift a quote that has not
+        # been seen yet past it, a common token such as "the" is only looked
+        # up for the quotes that can still make the top.
+        scores = {}
+        still_possible = sum(ceiling for _, ceiling, _ in terms)
+        for idf, ceiling, postings in terms:
+            if 0 < limit <= len(scores):
+                threshold = heapq.nlargest(limit, scores.values())[-1]
+            else:
+                threshold = 0
+            if threshold > still_possible:
+                matches = [
+                    (quote_id, postings[quote_id])
+                    for quote_id, score in scores.items()
+                    if score + still_possible >= threshold and quote_id in postings
+                ]
+            else:
+                matches = postings.items()
+            still_possible -= ceiling
+            for quote_id, positions in matches:
+                frequency = len(positions)
+                norm = 1 - self.B + self.B * self.lengths[quote_id] / average_length
+                score = idf * frequency * (self.K1 + 1) / (frequency + self.K1 * norm)
+                scores[quote_id] = scores.get(quote_id, 0) + score
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self.documents[quote_id] for quote_id, _ in best]
+
+    def search_phrase(self, phrase, limit=10):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return []
+        postings = [self.postings.get(token) for token in tokens]
+        if not all(postings):
+            return []
+
+        # Start from the rarest token so we check as few quotes as possible
+        candidates = min(postings, key=len)
+        results = []
+        for quote_id in sorted(candidates):
+            if not all(quote_id in posting for posting in postings):
+                continue
+            starts = set(postings[0][quote_id])
+            for offset, posting in enumerate(postings[1:], start=1):
+                starts &= {position - offset for position in posting[quote_id]}
+                if not starts:
+                    break
+            if starts:
+                results.append(self.documents[quote_id])
+                if len(results) == limit:
+                    break
+        return results
+
+    def search_author(self, author, limit=10):
+        tokens = tokenize(author)
+        if not tokens:
+            return []
+        matches = [self.authors.get(token, set()) for token in tokens]
+        quote_ids = set.intersection(*matches)
+        return [self.documents[quote_id] for quote_id in sorted(quote_ids)[:limit]]
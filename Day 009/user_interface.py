@@ -2,7 +2,9 @@ def display_menu():
     print("1. Get a random quote")
     print("2. Add a new quote")
     print("3. Remove a quote")
-    print("4. Quit")
+    print("4. Search quotes")
+    print("5. Search quotes by author")
+    print("6. Quit")
     print()
 
 def get_user_choice():
@@ -18,3 +20,13 @@ def get_user_choice():
 
 def get_user_input(prompt):
     return input(prompt)
+
+
+def display_quotes(results):
+    if not results:
+        print("No matching quotes found.")
+        print()
+        return
+    for number, (quote, author) in enumerate(results, start=1):
+        print(f"{number}. {quote} - {author}")
+    print()
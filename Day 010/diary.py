@@ -1,80 +1,146 @@
 import json
 import os
 from datetime import datetime
+from itertools import islice
+
+from diary_index import DiaryIndex
+from diary_storage import DiaryStore
 
 DIARY_FILE = "diary_entries.json"
+DIARY_DIR = "diary_segments"
+INDEX_FILE = os.path.join(DIARY_DIR, "search_index.json")
+PAGE_SIZE = 10
 
 
 def load_entries():
-    """Load diary entries from the JSON file."""
-    if os.path.exists(DIARY_FILE):
+    """Open the diary segments, importing the old JSON file the first time."""
+    entries = DiaryStore(DIARY_DIR)
+    if not entries and os.path.exists(DIARY_FILE):
         with open(DIARY_FILE, "r") as file:
-            return json.load(file)
-    return {}
+            entries.update(json.load(file))
+        entries.sync()
+    return entries
 
 
 def save_entries(entries):
-    """Save diary entries to the JSON file."""
-    with open(DIARY_FILE, "w") as file:
-        json.dump(entries, file, indent=4)
+    """Commit the latest diary changes to disk."""
+    entries.commit()
+
+
+def load_index(entries):
+    """Load the saved search index, rebuilding it if the diary changed since."""
+    index = DiaryIndex.load(INDEX_FILE, entries.log_position())
+    if index is None:
+        index = DiaryIndex.build(entries)
+    return index
+
+
+def save_index(entries, index):
+    """Save the search index next to the diary segments."""
+    index.save(INDEX_FILE, entries.log_position())
+
+
+def new_entry_key(entries, timestamp):
+    """Build a key for a new entry, numbering entries written in the same second."""
+    sequence = 0
+    while f"{timestamp} #{sequence:03d}" in entries:
+        sequence += 1
+    return f"{timestamp} #{sequence:03d}"
+
 
+def entry_date(key):
+    """Return the date and time part of an entry key."""
+    return key.split(" #")[0]
 
-def add_entry(entries):
+
+def add_entry(entries, index):
     """Add a new diary entry."""
-    date = datetime.now().strftime("%Y-%m-%d")
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     content = input("Enter your diary entry:\n")
-    entries[date] = content
+    key = new_entry_key(entries, timestamp)
+    index.add(key, content)
+    entries[key] = content
     save_entries(entries)
     print("Entry added successfully!")
 
 
+def iter_pages(entries, page_size=PAGE_SIZE):
+    """Yield numbered entries one page at a time, reading each page only when asked."""
+    numbered = enumerate(entries.items(), start=1)
+    while True:
+        page = list(islice(numbered, page_size))
+        if not page:
+            return
+        yield page
+
+
 def view_entries(entries):
-    """View all diary entries."""
+    """View diary entries one page at a time."""
     if not entries:
         print("No entries found.")
         return
-    for index, (date, content) in enumerate(entries.items(), start=1):
-        print(f"\nEntry #{index}")
-        print(f"Date: {date}")
-        print(f"Content: {content}")
+    for page in iter_pages(entries):
+        for number, (key, content) in page:
+            print(f"\nEntry #{number}")
+            print(f"Date: {entry_date(key)}")
+            print(f"Content: {content}")
+            print("-" * 40)
+        if page[-1][0] < len(entries):
+            if input("Press Enter for more entries, or q to stop: ").lower() == "q":
+                break
+
+
+def view_entries_between(entries):
+    """View the entries written between two dates."""
+    start_date = input("From date (YYYY-MM-DD): ").strip()
+    end_date = input("To date (YYYY-MM-DD): ").strip()
+    found = False
+    for key in entries.range(start_date, end_date):
+        found = True
+        print(f"\nDate: {entry_date(key)}")
+        print(f"Content: {entries[key]}")
         print("-" * 40)
+    if not found:
+        print(f"No entries found between {start_date} and {end_date}.")
 
 
-def search_entries(entries):
-    """Search for entries containing a specific word."""
-    keyword = input("Enter a word to search for: ").lower()
-    found_entries = {
-        date: content for date, content in entries.items() if keyword in content.lower()
-    }
+def search_entries(entries, index):
+    """Search for entries containing specific words."""
+    keyword = input(
+        "Enter words to search for (use OR for alternatives, * for prefixes): "
+    )
+    start_date = input("From date (YYYY-MM-DD, leave blank for any): ").strip()
+    end_date = input("To date (YYYY-MM-DD, leave blank for any): ").strip()
+    found_keys = index.search(keyword, start_date or None, end_date or None)
 
-    if found_entries:
+    if found_keys:
         print(f"\nEntries containing '{keyword}':")
-        for index, (date, content) in enumerate(found_entries.items(), start=1):
-            print(f"\nEntry #{index}")
-            print(f"Date: {date}")
-            print(f"Content: {content}")
+        for number, key in enumerate(found_keys, start=1):
+            print(f"\nEntry #{number}")
+            print(f"Date: {entry_date(key)}")
+            print(f"Content: {entries[key]}")
             print("-" * 40)
     else:
         print(f"No entries found containing '{keyword}'.")
 
 
-def delete_entry(entries):
+def delete_entry(entries, index):
     """Delete a specific entry by number."""
     if not entries:
         print("No entries found.")
         return
 
     print("Current entries:")
-    entry_list = list(entries.items())
-    for index, (date, content) in enumerate(entry_list, start=1):
+    for number, (key, content) in enumerate(entries.items(), start=1):
         preview = content[:50] + "..." if len(content) > 50 else content
-        print(f"Entry #{index} - {date}: {preview}")
+        print(f"Entry #{number} - {entry_date(key)}: {preview}")
 
     try:
         entry_number = int(input("\nEnter the number of the entry to delete: "))
-        if 1 <= entry_number <= len(entry_list):
-            date_to_delete = entry_list[entry_number - 1][0]
-            del entries[date_to_delete]
+        if 1 <= entry_number <= len(entries):
+            key_to_delete = entries.key_at(entry_number - 1)
+            index.remove(key_to_delete, entries[key_to_delete])
+            del entries[key_to_delete]
             save_entries(entries)
             print("Entry deleted successfully!")
         else:
@@ -85,29 +151,36 @@ def delete_entry(entries):
 
 def main():
     entries = load_entries()
+    index = load_index(entries)
+    entries.start_compaction()
 
     while True:
         print("\nPersonal Diary/Journal")
         print("1. Add a new entry")
         print("2. View all entries")
-        print("3. Search entries")
-        print("4. Delete an entry")
-        print("5. Exit")
+        print("3. View entries between two dates")
+        print("4. Search entries")
+        print("5. Delete an entry")
+        print("6. Exit")
         print()
 
-        choice = input("Enter your choice (1-5): ")
+        choice = input("Enter your choice (1-6): ")
         print()
 
         if choice == "1":
-            add_entry(entries)
+            add_entry(entries, index)
         elif choice == "2":
             view_entries(entries)
         elif choice == "3":
-            search_entries(entries)
+            view_entries_between(entries)
         elif choice == "4":
-            delete_entry(entries)
+            search_entries(entries, index)
         elif choice == "5":
+            delete_entry(entries, index)
+        elif choice == "6":
             print("Thank you for using the Personal Diary/Journal. Goodbye!")
+            entries.close()
+            save_index(entries, index)
             break
         else:
             print("Invalid choice. Please try again.")
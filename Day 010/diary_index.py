@@ -0,0 +1,125 @@
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right, insort
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Split text into lowercase words."""
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+class DiaryIndex:
+    """Inverted index from words to the keys of the entries that contain them."""
+
+    def __init__(self):
+        self.postings = {}  # word -> set of entry dates
+        self.terms = []  # every indexed word, kept sorted for prefix searches
+        self.dates = []  # every indexed date, kept sorted for date ranges
+
+    @classmethod
+    def build(cls, entries):
+        """Index every entry in the diary."""
+        index = cls()
+        for date, content in entries.items():
+            index.add(date, content)
+        return index
+
+    @classmethod
+    def load(cls, path, position):
+        """Load a saved index, or return None if it is missing or out of date."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as file:
+            data = json.load(file)
+        if data.get("position") != list(position):
+            return None
+        index = cls()
+        index.postings = {word: set(dates) for word, dates in data["postings"].items()}
+        index.terms = sorted(index.postings)
+        index.dates = sorted(data["dates"])
+        return index
+
+    def save(self, path, position):
+        """Save the index along with the storage position it matches."""
+        data = {
+            "position": list(position),
+            "dates": self.dates,
+            "postings": {word: sorted(dates) for word, dates in self.postings.items()},
+        }
+        temporary = path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(data, file)
+        os.replace(temporary, path)
+
+    def add(self, date, content, old_content=None):
+        """Index a new entry, replacing the words of the entry it overwrites."""
+        if old_content is not None:
+            self.remove(date, old_content)
+        for word in tokenize(content):
+            if word not in self.postings:
+                self.postings[word] = set()
+                insort(self.terms, word)
+            self.postings[word].add(date)
+        insort(self.dates, date)
+
+    def remove(self, date, content):
+        """Remove a deleted entry from the index."""
+        for word in tokenize(content):
+            dates = self.postings.get(word)
+            if dates is None:
+                continue
+            dates.discard(date)
+            if not dates:
+                del self.postings[word]
+                del self.terms[bisect_left(self.terms, word)]
+        position = bisect_left(self.dates, date)
+        if position < len(self.dates) and self.dates[position] == date:
+            del self.dates[position]
+
+    def match_word(self, word):
+        """Return the dates for a word, or for all words it prefixes if it ends in *."""
+        if not word.endswith("*"):
+            return self.postings.get(word, set())
+        prefix = word[:-1]
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + "\uffff")
+        dates = set()
+        for term in self.terms[start:end]:
+            dates |= self.postings[term]
+        return dates
+
+    def search(self, query, start_date=None, end_date=None):
+        """Return the sorted dates matching a query like "walk park OR beach*".
+
+        Words are combined with AND, and OR separates alternatives. An optional
+        start and end date (inclusive) narrow the results.
+        """
+        results = set()
+        for group in re.split(r"\s+OR\s+", query.strip()):
+            words = [word.lower() for word in group.split() if word != "AND"]
+            if not words:
+                continue
+            # Intersect the smallest sets first so the work shrinks quickly
+            matches = sorted((self.match_word(word) for word in words), key=len)
+            results |= set.intersection(*matches)
+
+        if start_date or end_date:
+            low = bisect_left(self.dates, start_date) if start_date else 0
+            if end_date:
+                # Keys start with the date, so take in every entry on end_date too
+                end_date += "\uffff"
+            high = bisect_right(self.dates, end_date) if end_date else len(self.dates)
+            in_range = self.dates[low:high]
+            if len(in_range) < len(results):
+                results &= set(in_range)
+            else:
+                results = {
+                    date
+                    for date in results
+                    if (not start_date or date >= start_date)
+                    and (not end_date or date <= end_date)
+                }
+        return sorted(results)
@@ -0,0 +1,418 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+
+from diary_timeline import Timeline
+
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".jsonl"
+COMPACTION_MARKER = "compacting.txt"
+COLD_FILE = "cold_blocks.dat"
+COLD_SEGMENT = 0  # segment number used in the index for entries in cold blocks
+BLOCK_HEADER = struct.Struct(">II")  # length of the date list, length of the data
+
+
+class DiaryStore(MutableMapping):
+    """Diary entries kept in append-only JSONL segments with an offset index."""
+
+    def __init__(
+        self,
+        directory,
+        max_segment_size=4 * 1024 * 1024,
+        fsync_every=32,
+        fsync_interval=1.0,
+        compact_ratio=0.5,
+        cold_after_days=90,
+        block_entries=64,
+        block_cache_size=16,
+    ):
+        self.directory = directory
+        self.max_segment_size = max_segment_size
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_ratio = compact_ratio
+        self.cold_after_days = cold_after_days
+        self.block_entries = block_entries
+        self.block_cache_size = block_cache_size
+        self.lock = threading.RLock()
+        self.index = {}  # entry key -> (segment number, offset, length)
+        self.segment_sizes = {}  # segment number -> size in bytes
+        self.maps = {}  # segment number -> mmap of the segment file
+        self.live_sizes = {}  # segment number -> bytes still used by live entries
+        self.pending_writes = 0
+        self.last_sync = time.monotonic()
+        self.compactor = None
+        self.compaction_lock = threading.Lock()  # one compaction at a time
+        self.cold_dates = set()  # dates with a copy somewhere in the cold blocks
+        self.block_cache = OrderedDict()  # block offset -> list of contents
+        self.cold_path = os.path.join(directory, COLD_FILE)
+        os.makedirs(directory, exist_ok=True)
+        self.finish_compaction()
+        self.load_cold_blocks()
+        self.load_index()
+        self.timeline = Timeline(self.index)  # the same keys, in order
+        self.open_active_segment()
+
+    def segment_path(self, number):
+        """Return the file path of a segment."""
+        filename = f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+        return os.path.join(self.directory, filename)
+
+    def segment_numbers(self):
+        """List the segment numbers on disk, oldest first."""
+        numbers = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(
+                SEGMENT_SUFFIX
+            ):
+                number = filename[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]
+                numbers.append(int(number))
+        return sorted(numbers)
+
+    def finish_compaction(self):
+        """Clean up after a compaction that was interrupted by a crash."""
+        marker = os.path.join(self.directory, COMPACTION_MARKER)
+        if not os.path.exists(marker):
+            return
+        with open(marker) as file:
+            numbers = [int(number) for number in file.read().split()]
+        target, older = numbers[0], numbers[1:]
+        temporary = self.segment_path(target) + ".compact"
+        if os.path.exists(temporary):
+            # The compacted segment never replaced the old ones, keep the old ones
+            os.remove(temporary)
+        else:
+            for number in older:
+                if os.path.exists(self.segment_path(number)):
+                    os.remove(self.segment_path(number))
+        os.remove(marker)
+
+    def load_cold_blocks(self):
+        """Index the entries in the cold blocks by reading only the block headers."""
+        if not os.path.exists(self.cold_path):
+            return
+        size = os.path.getsize(self.cold_path)
+        offset = 0
+        with open(self.cold_path, "rb") as file:
+            while offset + BLOCK_HEADER.size <= size:
+                dates_length, data_length = BLOCK_HEADER.unpack(
+                    file.read(BLOCK_HEADER.size)
+                )
+                end = offset + BLOCK_HEADER.size + dates_length + data_length
+                if end > size:
+                    break
+                dates = json.loads(file.read(dates_length))
+                for position, date in enumerate(dates):
+                    self.index[date] = (COLD_SEGMENT, offset, position)
+                    self.cold_dates.add(date)
+                file.seek(data_length, os.SEEK_CUR)
+                offset = end
+        if offset < size:
+            # A crash left half a block at the end, drop it
+            with open(self.cold_path, "r+b") as file:
+                file.truncate(offset)
+
+    def read_block(self, offset):
+        """Decompress a cold block, keeping recently used blocks in an LRU cache."""
+        if offset in self.block_cache:
+            self.block_cache.move_to_end(offset)
+            return self.block_cache[offset]
+        with open(self.cold_path, "rb") as file:
+            file.seek(offset)
+            dates_length, data_length = BLOCK_HEADER.unpack(
+                file.read(BLOCK_HEADER.size)
+            )
+            file.seek(dates_length, os.SEEK_CUR)
+            contents = json.loads(zlib.decompress(file.read(data_length)))
+        self.block_cache[offset] = contents
+        if len(self.block_cache) > self.block_cache_size:
+            self.block_cache.popitem(last=False)
+        return contents
+
+    def write_cold_blocks(self, items):
+        """Append (date, content) pairs to the cold file as compressed blocks."""
+        locations = {}
+        with open(self.cold_path, "ab") as file:
+            offset = file.tell()
+            for start in range(0, len(items), self.block_entries):
+                block = items[start : start + self.block_entries]
+                dates = json.dumps([date for date, _ in block]).encode("utf-8")
+                contents = json.dumps([content for _, content in block])
+                data = zlib.compress(contents.encode("utf-8"))
+                file.write(BLOCK_HEADER.pack(len(dates), len(data)) + dates + data)
+                for position, (date, _) in enumerate(block):
+                    locations[date] = (COLD_SEGMENT, offset, position)
+                offset += BLOCK_HEADER.size + len(dates) + len(data)
+            file.flush()
+            os.fsync(file.fileno())
+        return locations
+
+    def load_index(self):
+        """Replay every segment to find where each live entry is stored."""
+        numbers = self.segment_numbers()
+        for number in numbers:
+            size = os.path.getsize(self.segment_path(number))
+            self.segment_sizes[number] = size
+            data = self.map_segment(number)
+            offset = 0
+            while offset < size:
+                end = data.find(b"\n", offset)
+                if end == -1:
+                    break
+                record = json.loads(data[offset:end])
+                self.apply_record(record, number, offset, end - offset + 1)
+                offset = end + 1
+            if offset < size and number == numbers[-1]:
+                # A crash left half a record at the end, drop it
+                self.unmap_segment(number)
+                with open(self.segment_path(number), "r+b") as file:
+                    file.truncate(offset)
+                self.segment_sizes[number] = offset
+
+    def apply_record(self, record, number, offset, length):
+        """Update the index with one record read from a segment."""
+        date = record["date"]
+        if record.get("deleted"):
+            old = self.index.pop(date, None)
+        else:
+            old = self.index.get(date)
+            self.index[date] = (number, offset, length)
+            self.live_sizes[number] = self.live_sizes.get(number, 0) + length
+        if old is not None and old[0] != COLD_SEGMENT:
+            self.live_sizes[old[0]] -= old[2]
+
+    def open_active_segment(self):
+        """Open the newest segment for appending, starting a new one if it is full."""
+        numbers = sorted(self.segment_sizes)
+        if numbers and self.segment_sizes[numbers[-1]] < self.max_segment_size:
+            self.active = numbers[-1]
+        else:
+            self.active = numbers[-1] + 1 if numbers else 1
+            self.segment_sizes[self.active] = 0
+        self.writer = open(self.segment_path(self.active), "ab")
+
+    def map_segment(self, number):
+        """Memory-map a segment for reading, remapping it if the file has grown."""
+        data = self.maps.get(number)
+        size = self.segment_sizes[number]
+        if data is None or len(data) < size:
+            self.unmap_segment(number)
+            if size == 0:
+                return b""
+            with open(self.segment_path(number), "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[number] = data
+        return data
+
+    def unmap_segment(self, number):
+        """Close the memory map of a segment if it is open."""
+        data = self.maps.pop(number, None)
+        if data is not None:
+            data.close()
+
+    def append(self, record):
+        """Append one record to the active segment and return where it went."""
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        number, offset = self.active, self.segment_sizes[self.active]
+        self.writer.write(line)
+        self.segment_sizes[number] += len(line)
+        self.pending_writes += 1
+        if self.segment_sizes[number] >= self.max_segment_size:
+            self.sync()
+            self.writer.close()
+            self.open_active_segment()
+        return number, offset, len(line)
+
+    def __getitem__(self, date):
+        with self.lock:
+            number, offset, length = self.index[date]
+            if number == COLD_SEGMENT:
+                return self.read_block(offset)[length]
+            if number == self.active:
+                self.writer.flush()
+            data = self.map_segment(number)
+            return json.loads(data[offset : offset + length])["content"]
+
+    def __setitem__(self, date, content):
+        with self.lock:
+            if date not in self.index:
+                self.timeline.add(date)
+            location = self.append({"date": date, "content": content})
+            self.apply_record({"date": date}, *location)
+
+    def __delitem__(self, date):
+        with self.lock:
+            if date not in self.index:
+                raise KeyError(date)
+            self.append({"date": date, "deleted": True})
+            self.apply_record({"date": date, "deleted": True}, None, None, 0)
+            self.timeline.remove(date)
+
+    def __iter__(self):
+        return iter(self.timeline)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, date):
+        return date in self.index
+
+    def key_at(self, position):
+        """Return the key of the entry at a position in date order."""
+        return self.timeline[position]
+
+    def range(self, start_date, end_date):
+        """Yield the keys of entries written from start_date through end_date."""
+        # Keys start with the date, so this also takes in every entry on end_date
+        return self.timeline.range(start_date, end_date + "\uffff")
+
+    def log_position(self):
+        """Return where the log currently ends, which changes with every write."""
+        return self.active, self.segment_sizes[self.active]
+
+    def commit(self):
+        """Hand new records to the OS, and fsync once enough have piled up."""
+        with self.lock:
+            self.writer.flush()
+            waited = time.monotonic() - self.last_sync
+            if self.pending_writes >= self.fsync_every or waited >= self.fsync_interval:
+                self.sync()
+        self.maybe_compact()
+
+    def sync(self):
+        """Force every written record onto the disk."""
+        with self.lock:
+            self.writer.flush()
+            if self.pending_writes:
+                os.fsync(self.writer.fileno())
+                self.pending_writes = 0
+            self.last_sync = time.monotonic()
+
+    def sealed_segments(self):
+        """List the segments that are no longer written to, oldest first."""
+        return sorted(number for number in self.segment_sizes if number != self.active)
+
+    def garbage_ratio(self):
+        """Return the fraction of sealed bytes used by old or deleted entries."""
+        sealed = self.sealed_segments()
+        total = sum(self.segment_sizes[number] for number in sealed)
+        live = sum(self.live_sizes.get(number, 0) for number in sealed)
+        return (total - live) / total if total else 0.0
+
+    def maybe_compact(self):
+        """Start a background compaction when old segments are mostly garbage."""
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        if self.garbage_ratio() > self.compact_ratio:
+            self.compactor = threading.Thread(target=self.compact, daemon=True)
+            self.compactor.start()
+
+    def start_compaction(self, seal_active=True):
+        """Compact in a background thread, first sealing the active segment."""
+        with self.lock:
+            if seal_active and self.segment_sizes[self.active]:
+                self.sync()
+                self.writer.close()
+                self.active += 1
+                self.segment_sizes[self.active] = 0
+                self.writer = open(self.segment_path(self.active), "ab")
+        if self.compactor is None or not self.compactor.is_alive():
+            self.compactor = threading.Thread(target=self.compact, daemon=True)
+            self.compactor.start()
+
+    def compact(self):
+        """Rewrite the sealed segments so they only hold live, recent entries.
+
+        Entries older than cold_after_days move into compressed cold blocks.
+        The store stays usable while the new files are written; the lock is
+        only held to take a copy of the index and to swap the files in.
+        """
+        with self.compaction_lock:
+            self.compact_sealed()
+
+    def compact_sealed(self):
+        cutoff = datetime.now() - timedelta(days=self.cold_after_days)
+        cutoff = cutoff.strftime("%Y-%m-%d")
+        with self.lock:
+            sealed = self.sealed_segments()
+            if not sealed:
+                return
+            # Sealed segments are never written again, so their maps can be
+            # read without the lock
+            maps = {number: self.map_segment(number) for number in sealed}
+            live = [
+                (date, location)
+                for date, location in self.index.items()
+                if location[0] in maps
+            ]
+            deleted = self.cold_dates - self.index.keys()
+
+        target = sealed[-1]
+        temporary = self.segment_path(target) + ".compact"
+        moved = {}
+        cold = []
+        offset = 0
+        with open(temporary, "wb") as file:
+            for date, (number, start, length) in live:
+                line = maps[number][start : start + length]
+                if date < cutoff:
+                    cold.append((date, json.loads(line)["content"]))
+                    continue
+                file.write(line)
+                moved[date] = (target, offset, length)
+                offset += length
+            # Deleting an entry must outlive compaction while a cold copy exists
+            for date in deleted:
+                line = (json.dumps({"date": date, "deleted": True}) + "\n").encode()
+                file.write(line)
+                offset += len(line)
+            file.flush()
+            os.fsync(file.fileno())
+        if cold:
+            moved.update(self.write_cold_blocks(sorted(cold)))
+
+        with self.lock:
+            # Record what we are about to delete so a crash halfway through can
+            # neither lose live entries nor bring deleted ones back.
+            marker = os.path.join(self.directory, COMPACTION_MARKER)
+            with open(marker, "w") as file:
+                file.write(" ".join(str(number) for number in [target] + sealed[:-1]))
+                file.flush()
+                os.fsync(file.fileno())
+            for number in sealed:
+                self.unmap_segment(number)
+                del self.segment_sizes[number]
+                self.live_sizes.pop(number, None)
+            os.replace(temporary, self.segment_path(target))
+            for number in sealed[:-1]:
+                os.remove(self.segment_path(number))
+            os.remove(marker)
+
+            # Entries written or deleted since the copy was taken already point
+            # at the active segment, whose records come later and win on replay
+            still_live = 0
+            for date, location in live:
+                if self.index.get(date) == location:
+                    self.index[date] = moved[date]
+                    if moved[date][0] != COLD_SEGMENT:
+                        still_live += location[2]
+            self.cold_dates.update(date for date, _ in cold)
+            self.segment_sizes[target] = offset
+            self.live_sizes[target] = still_live
+
+    def close(self):
+        """Finish any compaction, sync pending writes and close every file."""
+        if self.compactor is not None:
+            self.compactor.join()
+        with self.lock:
+            self.sync()
+            self.writer.close()
+            for number in list(self.maps):
+                self.unmap_segment(number)
@@ -0,0 +1,104 @@
+import random
+
+MAX_LEVEL = 24  # plenty for millions of entries
+
+
+class Node:
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level  # how many positions each link skips over
+
+
+class Timeline:
+    """Entry keys kept in order by an indexable skip list.
+
+    Adding a key, removing one and finding the key at a position all take
+    O(log n) steps on average, so the diary never has to build a sorted list.
+    """
+
+    def __init__(self, keys=()):
+        self.head = Node(None, MAX_LEVEL)
+        self.size = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        node = self.head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def __contains__(self, key):
+        node = self.find_before(key)[0].next[0]
+        return node is not None and node.key == key
+
+    def find_before(self, key):
+        """Return the last node before key on every level, plus its position."""
+        before = [None] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node, position = self.head, 0
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            before[level] = node
+            positions[level] = position
+        return before, positions
+
+    def random_level(self):
+        level = 1
+        while level < MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def add(self, key):
+        before, positions = self.find_before(key)
+        position = positions[0]
+        node = Node(key, self.random_level())
+        for level in range(len(node.next)):
+            previous = before[level]
+            skipped = position - positions[level]
+            node.next[level] = previous.next[level]
+            node.width[level] = previous.width[level] - skipped
+            previous.next[level] = node
+            previous.width[level] = skipped + 1
+        for level in range(len(node.next), MAX_LEVEL):
+            before[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        before = self.find_before(key)[0]
+        node = before[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for level in range(MAX_LEVEL):
+            previous = before[level]
+            if previous.next[level] is node:
+                previous.next[level] = node.next[level]
+                previous.width[level] += node.width[level] - 1
+            else:
+                previous.width[level] -= 1
+        self.size -= 1
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.size
+        if not 0 <= position < self.size:
+            raise IndexError("Timeline index out of range")
+        node, remaining = self.head, position + 1
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node.key
+
+    def range(self, start, end):
+        """Yield the keys from start up to and including end, in order."""
+        node = self.find_before(start)[0][0].next[0]
+        while node is not None and node.key <= end:
+            yield node.key
+            node = node.next[0]
@@ -0,0 +1,204 @@
+import heapq
+import threading
+from bisect import bisect_left
+from collections import Counter
+from itertools import groupby
+
+from library_storage import TITLE_WORD, title_words
+
+MAX_SUGGESTIONS = 10  # the most completions one call can return
+SCAN_WORDS = 64  # prefixes shared by more words than this keep a top list
+MERGE_ONE_BY_ONE = 1000  # fewer new words than this are inserted one at a time
+
+
+def completion_words(title, author):
+    return title_words(title) | title_words(author)
+
+
+class Autocomplete:
+    """Type-ahead completion over the words of book titles and authors.
+
+    The words are kept in a sorted list, so the words that start with a prefix
+    are found with two bisects. Matching books are ranked by how often they
+    have been borrowed. Words with many books, and prefixes shared by many
+    words, keep their best MAX_SUGGESTIONS books in a short list that borrow()
+    updates in place, so a completion never has to rank a whole catalog.
+    """
+
+    def __init__(self):
+        self.words = []  # sorted; may still hold words that have no books left
+        self.new_words = set()  # words not merged into self.words yet
+        self.postings = {}  # word -> set of ISBNs
+        self.counts = Counter()  # ISBN -> times borrowed
+        self.word_top = {}  # word -> best ISBNs, for words with many books
+        self.prefix_top = {}  # prefix -> best ISBNs, for prefixes with many words
+        self.lock = threading.Lock()
+
+    def rank(self, isbn):
+        # Most borrowed first, ties broken by ISBN so the order never changes
+        return -self.counts[isbn], isbn
+
+    def add(self, isbn, words, borrowed=0):
+        with self.lock:
+            if borrowed:
+                self.counts[isbn] = borrowed
+            for word in words:
+                books = self.postings.get(word)
+                if books is None:
+                    books = self.postings[word] = set()
+                    self.new_words.add(word)
+                books.add(isbn)
+            self.promote(isbn, words)
+
+    def add_many(self, isbns, words_of_each):
+        # Adds books that have never been borrowed, with the words of each.
+        # Moving each one through the top lists costs a call per prefix of
+        # every word, so for a large batch the lists are dropped instead and
+        # rebuilt from the postings the next time they are needed.
+        if len(isbns) < MERGE_ONE_BY_ONE:
+            for isbn, words in zip(isbns, words_of_each):
+                self.add(isbn, words)
+            return
+        with self.lock:
+            for isbn, words in zip(isbns, words_of_each):
+                for word in words:
+                    books = self.postings.get(word)
+                    if books is None:
+                        books = self.postings[word] = set()
+                        self.new_words.add(word)
+                    books.add(isbn)
+            self.word_top.clear()
+            self.prefix_top.clear()
+
+    def remove(self, isbn, words):
+        with self.lock:
+            self.counts.pop(isbn, None)
+            for word in words:
+                books = self.postings.get(word)
+                if books is None:
+                    continue
+                books.discard(isbn)
+                if not books:
+                    # The word itself is dropped from self.words on the next re-sort
+                    del self.postings[word]
+                    self.new_words.discard(word)
+                # A top list that loses a book cannot tell which book comes
+                # next, so it is thrown away and rebuilt when it is next needed
+                if isbn in self.word_top.get(word, ()):
+                    del self.word_top[word]
+                for end in range(1, len(word) + 1):
+                    if isbn in self.prefix_top.get(word[:end], ()):
+                        del self.prefix_top[word[:end]]
+
+    def borrow(self, isbn, words):
+        with self.lock:
+            self.counts[isbn] += 1
+            self.promote(isbn, words)
+
+    def promote(self, isbn, words):
+        # isbn was added or borrowed, so it can only move up in the top lists
+        for word in words:
+            self.offer(self.word_top.get(word), isbn)
+            for end in range(1, len(word) + 1):
+                self.offer(self.prefix_top.get(word[:end]), isbn)
+
+    def offer(self, top, isbn):
+        if top is None:
+            return
+        rank = self.rank(isbn)
+        if isbn in top:
+            top.remove(isbn)
+        elif len(top) == MAX_SUGGESTIONS and rank >= self.rank(top[-1]):
+            return
+        position = 0
+        while position < len(top) and self.rank(top[position]) < rank:
+            position += 1
+        top.insert(position, isbn)
+        del top[MAX_SUGGESTIONS:]
+
+    def merge_new_words(self):
+        if len(self.new_words) < MERGE_ONE_BY_ONE:
+            for word in self.new_words:
+                position = bisect_left(self.words, word)
+                if self.words[position : position + 1] != [word]:
+                    self.words.insert(position, word)
+        else:
+            self.words = sorted(self.postings)
+        self.new_words.clear()
+
+    def word_range(self, prefix):
+        if self.new_words:
+            self.merge_new_words()
+        start = bisect_left(self.words, prefix)
+        return start, bisect_left(self.words, prefix + "\uffff", start)
+
+    def best_for_word(self, word):
+        books = self.postings.get(word, ())
+        if len(books) <= MAX_SUGGESTIONS:
+            return books
+        top = self.word_top.get(word)
+        if top is None:
+            top = heapq.nsmallest(MAX_SUGGESTIONS, books, key=self.rank)
+            self.word_top[word] = top
+        return top
+
+    def best_for_words(self, words):
+        # The best books for a group of words are among the best of each word
+        candidates = set()
+        for word in words:
+            candidates.update(self.best_for_word(word))
+        return heapq.nsmallest(MAX_SUGGESTIONS, candidates, key=self.rank)
+
+    def best_for_prefix(self, prefix):
+        top = self.prefix_top.get(prefix)
+        if top is not None:
+            return top
+        start, end = self.word_range(prefix)
+        top = self.best_for_words(self.words[start:end])
+        if end - start > SCAN_WORDS:
+            self.prefix_top[prefix] = top
+        return top
+
+    def warm(self, max_length=3):
+        # Builds the top lists of the short prefixes up front, so even the
+        # first completion of "t" or "th" comes straight from a list
+        with self.lock:
+            if self.new_words:
+                self.merge_new_words()
+            for length in range(1, max_length + 1):
+                for prefix, group in groupby(self.words, key=lambda w: w[:length]):
+                    words = list(group)
+                    if len(prefix) == length and len(words) > SCAN_WORDS:
+                        self.prefix_top[prefix] = self.best_for_words(words)
+
+    def complete(self, text, limit=MAX_SUGGESTIONS):
+        # The last word of text is completed; any words before it must match
+        # whole words of the title or author
+        words = TITLE_WORD.findall(text.lower())
+        if not words:
+            return []
+        if text[-1].isspace():
+            whole, prefix = words, ""
+        else:
+            whole, prefix = words[:-1], words[-1]
+        with self.lock:
+            if not whole:
+                return self.best_for_prefix(prefix)[:limit]
+            # Start with the rarest word so the intersection stays small
+            matches = sorted(
+                (self.postings.get(word, set()) for word in whole), key=len
+            )
+            candidates = set.intersection(*matches)
+            if prefix and candidates:
+                start, end = self.word_range(prefix)
+                candidates = set().union(
+                    *(
+                        candidates & self.postings.get(word, set())
+                        for word in self.words[start:end]
+                    )
+                )
+            limit = min(limit, MAX_SUGGESTIONS)
+            return heapq.nsmallest(limit, candidates, key=self.rank)
+
+    def times_borrowed(self, isbn):
+        return self.counts[isbn]
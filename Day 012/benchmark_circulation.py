@@ -0,0 +1,97 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+from library import Book, Library, Member
+from library_storage import LibraryDatabase
+
+
+def build_library(storage, books, copies, members):
+    library = Library(storage)
+    for number in range(books):
+        library.add_book(Book(f"Book {number}", "Author", f"isbn-{number}", copies))
+    for number in range(members):
+        library.add_member(Member(f"Member {number}", f"member-{number}"))
+    return library
+
+
+def kiosk(library, operations, books, members, seed):
+    rng = random.Random(seed)
+    for _ in range(operations):
+        member_id = f"member-{rng.randrange(members)}"
+        isbn = f"isbn-{rng.randrange(books)}"
+        if library.loans.count(member_id, isbn) and rng.random() < 0.5:
+            library.return_book(member_id, isbn)
+        else:
+            library.borrow_book(member_id, isbn)
+
+
+def check_invariants(library, books, copies):
+    loans_per_book = {}
+    for (member_id, isbn), due_dates in library.loans.loans.items():
+        loans_per_book[isbn] = loans_per_book.get(isbn, 0) + len(due_dates)
+        assert isbn in library.find_member(member_id).books_borrowed
+    for number in range(books):
+        isbn = f"isbn-{number}"
+        book = library.find_book(isbn)
+        assert 0 <= book.available_quantity <= copies, f"{isbn} was oversold"
+        on_loan = copies - book.available_quantity
+        assert on_loan == loans_per_book.get(isbn, 0), f"{isbn} lost track of a loan"
+        if library.storage is not None:
+            row = library.storage.load_book(isbn)
+            assert row[4] == book.available_quantity, f"{isbn} not saved correctly"
+
+
+def run_benchmark(
+    thread_counts=(1, 2, 4, 8),
+    operations=20000,
+    books=100,
+    copies=3,
+    members=500,
+    use_storage=False,
+):
+    label = "SQLite" if use_storage else "in-memory"
+    print(f"\nKiosk stress test ({label}), {operations} operations per run")
+    baseline = None
+    for threads in thread_counts:
+        with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as quiet:
+            storage = None
+            if use_storage:
+                storage = LibraryDatabase(os.path.join(directory, "benchmark.db"))
+            with redirect_stdout(quiet):
+                library = build_library(storage, books, copies, members)
+                workers = [
+                    threading.Thread(
+                        target=kiosk,
+                        args=(library, operations // threads, books, members, seed),
+                    )
+                    for seed in range(threads)
+                ]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - start
+            check_invariants(library, books, copies)
+            if storage is not None:
+                storage.close()
+
+        throughput = operations / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{threads:>2} threads: {throughput:>10,.0f} ops/sec "
+            f"({throughput / baseline:.2f}x), invariants hold"
+        )
+
+
+def main():
+    run_benchmark()
+    run_benchmark(operations=2000, use_storage=True)
+
+
+if __name__ == "__main__":
+    main()
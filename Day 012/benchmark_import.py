@@ -0,0 +1,63 @@
+import io
+import os
+import random
+import tempfile
+import time
+
+from catalog_import import import_catalog, isbn13_check_digit, normalize_isbn, read_csv
+from library import Library
+from library_storage import LibraryDatabase
+
+
+def make_csv(records, seed=0):
+    rng = random.Random(seed)
+    words = [f"word{number}" for number in range(5000)]
+    lines = ["title,author,isbn,quantity"]
+    for number in range(records):
+        isbn = f"978{number:09d}"
+        isbn += isbn13_check_digit(isbn)
+        title = " ".join(rng.choice(words) for _ in range(4))
+        author = f"Author {rng.randrange(50000)}"
+        lines.append(f"{title},{author},{isbn},{rng.randint(1, 5)}")
+    # A few records that must be rejected without stopping the import
+    lines += ["Bad Quantity,Author,9780306406157,two", "Short Row,Author"]
+    return "\n".join(lines) + "\n"
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(records=200_000):
+    text = make_csv(records)
+    print(f"\nImporting {records:,} CSV records")
+
+    def read_only():
+        books = read_csv(io.StringIO(text))
+        return [normalize_isbn(isbn) for _, _, isbn, _ in books if isbn]
+
+    _, elapsed = timed(read_only)
+    print(f"reading and ISBN checks only: {records / elapsed:>8,.0f} records/sec")
+
+    _, elapsed = timed(lambda: import_catalog(Library(), read_csv(io.StringIO(text))))
+    print(f"full import, in memory:       {records / elapsed:>8,.0f} records/sec")
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = LibraryDatabase(os.path.join(directory, "benchmark.db"))
+        library = Library(storage)
+        totals, elapsed = timed(
+            lambda: import_catalog(library, read_csv(io.StringIO(text)))
+        )
+        storage.close()
+    print(f"full import, SQLite:          {records / elapsed:>8,.0f} records/sec")
+    assert totals["added"] == records and totals["rejected"] == 2, totals
+
+
+def main():
+    run_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import csv
+from itertools import islice
+
+
+def isbn13_check_digit(first_twelve):
+    # Digits alternate between weights 1 and 3. Summing the ASCII codes adds
+    # 48 for every digit, which is taken off again at the end.
+    weighted = sum(first_twelve[::2].encode()) + 3 * sum(first_twelve[1::2].encode())
+    total = weighted - 48 * 24
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(raw):
+    # Returns the ISBN-13 form of an ISBN-10 or ISBN-13, or None if it is invalid
+    isbn = raw.replace("-", "").replace(" ", "").upper()
+    if not isbn.isascii():
+        return None
+    if len(isbn) == 10:
+        if not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] == "X"):
+            return None
+        digits = [int(digit) for digit in isbn[:9]] + [
+            10 if isbn[9] == "X" else int(isbn[9])
+        ]
+        if sum((10 - i) * digit for i, digit in enumerate(digits)) % 11:
+            return None
+        isbn = "978" + isbn[:9]
+        return isbn + isbn13_check_digit(isbn)
+    if len(isbn) == 13 and isbn.isdigit():
+        if isbn13_check_digit(isbn[:12]) != isbn[12]:
+            return None
+        return isbn
+    return None
+
+
+def read_csv(file):
+    # Expects a header row with title, author, isbn and (optionally) quantity.
+    # Fields missing from a short row come through as None, and the quantity
+    # as text; import_catalog checks both.
+    for row in csv.DictReader(file):
+        quantity = row.get("quantity") or 1
+        yield row.get("title"), row.get("author"), row.get("isbn"), quantity
+
+
+def marc_subfields(data):
+    # "10$aDune /$cFrank Herbert." -> {"a": "Dune /", "c": "Frank Herbert."}
+    subfields = {}
+    for part in data[2:].split("$")[1:]:
+        if part:
+            subfields.setdefault(part[0], part[1:].strip())
+    return subfields
+
+
+def read_marc(file):
+    # Reads MARC records in the mnemonic text format, one "=TAG  data" line per
+    # field and a blank line between records. Each 852 holdings field counts as
+    # one copy; a record without holdings counts as a single copy.
+    record = {}
+    copies = 0
+    for line in file:
+        line = line.rstrip("\n")
+        if not line.strip():
+            if record:
+                yield record_to_book(record, copies)
+            record, copies = {}, 0
+            continue
+        tag, data = line[1:4], line[6:]
+        if tag == "852":
+            copies += 1
+        elif tag in ("020", "100", "245") and tag not in record:
+            record[tag] = marc_subfields(data)
+    if record:
+        yield record_to_book(record, copies)
+
+
+def record_to_book(record, copies):
+    isbn = record.get("020", {}).get("a", "").split(" ")[0]
+    author = record.get("100", {}).get("a", "").rstrip(" .,")
+    if author.count(",") == 1:
+        last, first = author.split(",")
+        author = f"{first.strip()} {last.strip()}"
+    # Drop the catalogue punctuation that ends each part of the title
+    title_field = record.get("245", {})
+    parts = [title_field.get(code, "").rstrip(" /:;,.") for code in "ab"]
+    title = ": ".join(filter(None, parts))
+    return title, author, isbn, copies or 1
+
+
+def import_catalog(library, books, batch_size=10000, progress=None):
+    # books yields (title, author, isbn, quantity) tuples, for example from
+    # read_csv or read_marc, and is read one batch at a time so memory stays
+    # bounded. ISBNs already in the catalog get their quantities increased.
+    # progress, if given, is called after every batch with the running totals.
+    totals = {"read": 0, "added": 0, "merged": 0, "rejected": 0}
+    books = iter(books)
+    while True:
+        batch = list(islice(books, batch_size))
+        if not batch:
+            return totals
+        totals["read"] += len(batch)
+
+        # Normalize and merge duplicates inside the batch first
+        merged = {}
+        for title, author, isbn, quantity in batch:
+            try:
+                isbn = normalize_isbn(isbn)
+                quantity = int(quantity)
+                valid = isbn is not None and title and author is not None
+                valid = valid and quantity >= 1
+            except (AttributeError, TypeError, ValueError):
+                # A field missing from a short row, or a quantity such as "two"
+                valid = False
+            if not valid:
+                totals["rejected"] += 1
+                continue
+            if isbn in merged:
+                merged[isbn][3] += quantity
+            else:
+                merged[isbn] = [title, author, isbn, quantity]
+
+        # Hold every book lock while the batch is applied so kiosks never see
+        # half-imported quantities
+        with library.book_locks.hold_all():
+            if library.storage is not None:
+                existing = library.storage.existing_isbns(list(merged))
+            else:
+                existing = {isbn for isbn in merged if isbn in library.books}
+            new_books, additions = [], []
+            for isbn, (title, author, _, quantity) in merged.items():
+                if isbn not in existing:
+                    new_books.append((title, author, isbn, quantity))
+                    continue
+                additions.append((quantity, quantity, isbn))
+                book = library.books.get(isbn)
+                if book is not None:
+                    book.quantity += quantity
+                    book.available_quantity += quantity
+
+            if library.storage is not None:
+                library.storage.import_books(new_books, batch_size)
+                library.storage.add_quantities(additions)
+            # Book objects are only needed for the in-memory catalog and for a
+            # suggestion index that has already been built
+            if library.storage is None or library.completer is not None:
+                added = [
+                    library.book_from_row((title, author, isbn, quantity, quantity))
+                    for title, author, isbn, quantity in new_books
+                ]
+                if library.storage is None:
+                    library.books.update((book.isbn, book) for book in added)
+                    library.index_books(added)
+                library.add_completions(added)
+
+        totals["added"] += len(new_books)
+        totals["merged"] += len(additions)
+        if progress is not None:
+            progress(totals)
+
+
+def open_catalog(path):
+    # Picks the reader from the file extension: .csv, or MARC text otherwise
+    file = open(path, newline="", encoding="utf-8")
+    reader = read_csv if path.lower().endswith(".csv") else read_marc
+    return file, reader(file)
@@ -1,3 +1,26 @@
+import csv
+import heapq
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from autocomplete import Autocomplete, completion_words
+from catalog_import import import_catalog, normalize_isbn, open_catalog
+from library_storage import LibraryDatabase, normalize_author, title_words
+
+DATABASE_FILE = "library.db"
+LOAN_PERIOD_DAYS = 14
+
+
+def catalog_isbn(isbn):
+    # The key a book is filed under. A valid ISBN-10 or ISBN-13 becomes its
+    # ISBN-13, as the importer stores it, so every way of writing one ISBN
+    # finds the same book. Anything else is kept as typed.
+    isbn = isbn.strip()
+    return normalize_isbn(isbn) or isbn
+
+
 class Book:
     def __init__(self, title, author, isbn, quantity):
         self.title = title
@@ -14,91 +37,450 @@ class Member:
     def __init__(self, name, member_id):
         self.name = name
         self.member_id = member_id
-        self.books_borrowed = []
+        self.books_borrowed = set()  # ISBNs this member has at least one copy of
 
     def __str__(self):
         return f"{self.name} ({self.member_id})"
 
 
-class Library:
+class LockStripes:
+    # A fixed set of locks shared out by key, so two threads only wait for
+    # each other when their keys land on the same stripe.
+    def __init__(self, count=64):
+        self.locks = [threading.RLock() for _ in range(count)]
+
+    def for_key(self, key):
+        return self.locks[hash(key) % len(self.locks)]
+
+    @contextmanager
+    def hold_all(self):
+        # Always acquired in the same order, so two callers cannot deadlock
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
+
+class LoanLedger:
     def __init__(self):
-        self.books = []
-        self.members = []
+        self.loans = {}  # (member ID, ISBN) -> heap of due dates, one per copy
+        self.due_dates = []  # heap of (due date, member ID, ISBN) for every loan
+        self.returned = Counter()  # heap entries whose loan was already returned
+        self.lock = threading.Lock()
+
+    def count(self, member_id, isbn):
+        return len(self.loans.get((member_id, isbn), ()))
+
+    def add(self, member_id, isbn, due_date):
+        with self.lock:
+            heapq.heappush(self.loans.setdefault((member_id, isbn), []), due_date)
+            heapq.heappush(self.due_dates, (due_date, member_id, isbn))
+
+    def remove(self, member_id, isbn):
+        # Return the copy that is due first; its heap entry is skipped later on
+        with self.lock:
+            due_dates = self.loans[(member_id, isbn)]
+            due_date = heapq.heappop(due_dates)
+            if not due_dates:
+                del self.loans[(member_id, isbn)]
+            self.returned[(due_date, member_id, isbn)] += 1
+            return due_date
+
+    def overdue(self, today):
+        with self.lock:
+            return self.pop_overdue(today)
+
+    def pop_overdue(self, today):
+        # Only pops entries that are already overdue, then puts the live ones back
+        overdue = []
+        while self.due_dates and self.due_dates[0][0] < today:
+            entry = heapq.heappop(self.due_dates)
+            if self.returned[entry]:
+                self.returned[entry] -= 1
+                if not self.returned[entry]:
+                    del self.returned[entry]
+            else:
+                overdue.append(entry)
+        for entry in overdue:
+            heapq.heappush(self.due_dates, entry)
+        return overdue
+
+
+class LRUCache(OrderedDict):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self:
+                return default
+            self.move_to_end(key)
+            return self[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            if len(self) > self.size:
+                self.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            return super().pop(key, default)
+
+
+class Library:
+    def __init__(self, storage=None, cache_size=1024):
+        # Without storage everything lives in these dicts. With storage they
+        # only cache the most recently used books and members, and every
+        # change is written through to the database straight away.
+        self.storage = storage
+        self.books = LRUCache(cache_size) if storage else {}  # ISBN -> Book
+        self.members = LRUCache(cache_size) if storage else {}  # ID -> Member
+        self.books_by_author = {}  # normalized author -> set of ISBNs
+        self.books_by_title_word = {}  # title word -> set of ISBNs
+        self.loans = LoanLedger()
+        # Circulation changes to one book happen under that ISBN's stripe lock,
+        # so kiosks working on different books never wait for each other.
+        self.book_locks = LockStripes()
+        self.member_locks = LockStripes()
+        self.index_lock = threading.Lock()  # guards the two in-memory indexes
+        # With storage the suggestion index is only built the first time a
+        # patron asks for suggestions, so startup stays quick
+        self.completer = Autocomplete() if storage is None else None
+        self.completer_lock = threading.Lock()
+        if storage is not None:
+            for member_id, isbn, due_date in storage.iter_loans():
+                self.loans.add(member_id, isbn, date.fromisoformat(due_date))
+
+    def book_from_row(self, row):
+        title, author, isbn, quantity, available_quantity = row
+        # One lookup: the cache can evict between a check and a read
+        book = self.books.get(isbn)
+        if book is not None:
+            return book
+        book = Book(title, author, isbn, quantity)
+        book.available_quantity = available_quantity
+        return book
+
+    def all_books(self):
+        if self.storage is None:
+            return iter(self.books.values())
+        return (self.book_from_row(row) for row in self.storage.iter_books())
+
+    def all_members(self):
+        if self.storage is None:
+            return iter(self.members.values())
+        return (Member(*row) for row in self.storage.iter_members())
+
+    def index_book(self, book):
+        self.index_books([book])
+
+    def index_books(self, books):
+        with self.index_lock:
+            for book in books:
+                author = normalize_author(book.author)
+                self.books_by_author.setdefault(author, set()).add(book.isbn)
+                for word in title_words(book.title):
+                    self.books_by_title_word.setdefault(word, set()).add(book.isbn)
+
+    def unindex_book(self, book):
+        with self.index_lock:
+            author = normalize_author(book.author)
+            self.books_by_author[author].discard(book.isbn)
+            if not self.books_by_author[author]:
+                del self.books_by_author[author]
+            for word in title_words(book.title):
+                self.books_by_title_word[word].discard(book.isbn)
+                if not self.books_by_title_word[word]:
+                    del self.books_by_title_word[word]
+
+    def add_completion(self, book):
+        if self.completer is not None:
+            words = completion_words(book.title, book.author)
+            self.completer.add(book.isbn, words)
+
+    def add_completions(self, books):
+        # For new books, such as a batch of an import
+        if self.completer is not None:
+            words = [completion_words(book.title, book.author) for book in books]
+            self.completer.add_many([book.isbn for book in books], words)
+
+    def remove_completion(self, book):
+        if self.completer is not None:
+            words = completion_words(book.title, book.author)
+            self.completer.remove(book.isbn, words)
+
+    def load_completer(self):
+        with self.completer_lock:
+            if self.completer is None:
+                completer = Autocomplete()
+                for isbn, title, author, borrowed in self.storage.iter_completions():
+                    completer.add(isbn, completion_words(title, author), borrowed)
+                completer.warm()
+                self.completer = completer
+            return self.completer
 
     def add_book(self, book):
-        self.books.append(book)
-        print(f"Book added: {book}")
+        book.isbn = catalog_isbn(book.isbn)
+        with self.book_locks.for_key(book.isbn):
+            if self.find_book(book.isbn) is not None:
+                print(f"A book with ISBN {book.isbn} is already in the library.")
+                return
+            if self.storage is not None:
+                self.storage.add_book(
+                    book.title,
+                    book.author,
+                    book.isbn,
+                    book.quantity,
+                    book.available_quantity,
+                )
+            else:
+                self.index_book(book)
+            self.add_completion(book)
+            self.books[book.isbn] = book
+            print(f"Book added: {book}")
+
+    def remove_book(self, isbn):
+        isbn = catalog_isbn(isbn)
+        with self.book_locks.for_key(isbn):
+            book = self.find_book(isbn)
+            if book is None:
+                print("Book not found.")
+                return
+            if book.available_quantity < book.quantity:
+                print("Book cannot be removed while copies are borrowed.")
+                return
+            self.books.pop(isbn)
+            if self.storage is not None:
+                self.storage.remove_book(isbn)
+            else:
+                self.unindex_book(book)
+            self.remove_completion(book)
+            print(f"Book removed: {book}")
 
     def add_member(self, member):
-        self.members.append(member)
-        print(f"Member added: {member}")
+        with self.member_locks.for_key(member.member_id):
+            if self.find_member(member.member_id) is not None:
+                print(f"A member with ID {member.member_id} already exists.")
+                return
+            if self.storage is not None:
+                self.storage.add_member(member.name, member.member_id)
+            self.members[member.member_id] = member
+            print(f"Member added: {member}")
+
+    def remove_member(self, member_id):
+        with self.member_locks.for_key(member_id):
+            member = self.find_member(member_id)
+            if member is None:
+                print("Member not found.")
+                return
+            if member.books_borrowed:
+                print("Member cannot be removed while they have borrowed books.")
+                return
+            self.members.pop(member_id)
+            if self.storage is not None:
+                self.storage.remove_member(member_id)
+            print(f"Member removed: {member}")
 
     def display_books(self):
-        if not self.books:
+        found = False
+        for book in self.all_books():
+            if not found:
+                print("Books in the library:")
+                found = True
+            print(f"{book} - {book.available_quantity} available")
+        if not found:
             print("No books in the library.")
-            return
-        else:
-            print("Books in the library:")
-            for book in self.books:
-                print(f"{book} - {book.available_quantity} available")
 
     def display_members(self):
-        if not self.members:
+        found = False
+        for member in self.all_members():
+            if not found:
+                print("Members in the library:")
+                found = True
+            print(member)
+        if not found:
             print("No members in the library.")
-            return
-        else:
-            print("Members in the library:")
-            for member in self.members:
-                print(member)
 
     def find_book(self, isbn):
-        for book in self.books:
-            if book.isbn == isbn:
-                return book
-        return None
+        isbn = catalog_isbn(isbn)
+        book = self.books.get(isbn)
+        if book is None and self.storage is not None:
+            # Load under the stripe lock so two threads never end up with
+            # separate copies of the same book
+            with self.book_locks.for_key(isbn):
+                book = self.books.get(isbn)
+                if book is None:
+                    row = self.storage.load_book(isbn)
+                    if row is not None:
+                        book = self.book_from_row(row)
+                        self.books[isbn] = book
+        return book
 
     def find_member(self, member_id):
-        for member in self.members:
-            if member.member_id == member_id:
-                return member
-        return None
-
-    def borrow_book(self, member_id, isbn):
-        member = self.find_member(member_id)
-        if member is None:
-            print("Member not found.")
-            return
-        book = self.find_book(isbn)
-        if book is None:
-            print("Book not found.")
+        member = self.members.get(member_id)
+        if member is None and self.storage is not None:
+            with self.member_locks.for_key(member_id):
+                member = self.members.get(member_id)
+                if member is None:
+                    row = self.storage.load_member(member_id)
+                    if row is not None:
+                        member = Member(*row)
+                        member.books_borrowed = self.storage.borrowed_isbns(member_id)
+                        self.members[member_id] = member
+        return member
+
+    def find_books_by_author(self, author):
+        if self.storage is not None:
+            rows = self.storage.find_books_by_author(author)
+            return [self.book_from_row(row) for row in rows]
+        with self.index_lock:
+            isbns = list(self.books_by_author.get(normalize_author(author), ()))
+        books = (self.books.get(isbn) for isbn in isbns)
+        return [book for book in books if book is not None]
+
+    def find_books_by_title(self, title):
+        if self.storage is not None:
+            rows = self.storage.find_books_by_title(title)
+            return [self.book_from_row(row) for row in rows]
+        words = title_words(title)
+        if not words:
+            return []
+        with self.index_lock:
+            # Start with the rarest word so the intersection stays small
+            matches = sorted(
+                (self.books_by_title_word.get(word, set()) for word in words), key=len
+            )
+            isbns = set.intersection(*matches)
+        books = (self.books.get(isbn) for isbn in isbns)
+        return [book for book in books if book is not None]
+
+    def search_books(self, text):
+        books = {book.isbn: book for book in self.find_books_by_author(text)}
+        for book in self.find_books_by_title(text):
+            books.setdefault(book.isbn, book)
+        if not books:
+            print("No matching books found.")
             return
-        if book.available_quantity == 0:
-            print("Book not available to borrow.")
+        print("Matching books:")
+        for book in books.values():
+            print(f"{book} - {book.available_quantity} available")
+
+    def suggest_books(self, text, limit=10):
+        completer = self.load_completer()
+        books = (self.find_book(isbn) for isbn in completer.complete(text, limit))
+        return [book for book in books if book is not None]
+
+    def display_suggestions(self, text):
+        books = self.suggest_books(text)
+        if not books:
+            print("No suggestions.")
             return
-        book.available_quantity -= 1
-        member.books_borrowed.append(book)
-        print(f"{book.title} borrowed by {member}")
+        print("Suggestions, most borrowed first:")
+        for book in books:
+            times = self.completer.times_borrowed(book.isbn)
+            print(f"{book} - times borrowed: {times}")
+
+    def borrow_book(self, member_id, isbn, today=None):
+        isbn = catalog_isbn(isbn)
+        # Locks are always taken book first, then member, so they cannot deadlock
+        book_lock = self.book_locks.for_key(isbn)
+        with book_lock, self.member_locks.for_key(member_id):
+            member = self.find_member(member_id)
+            if member is None:
+                print("Member not found.")
+                return
+            book = self.find_book(isbn)
+            if book is None:
+                print("Book not found.")
+                return
+            if book.available_quantity == 0:
+                print("Book not available to borrow.")
+                return
+            due_date = (today or date.today()) + timedelta(days=LOAN_PERIOD_DAYS)
+            book.available_quantity -= 1
+            self.loans.add(member_id, isbn, due_date)
+            member.books_borrowed.add(isbn)
+            if self.storage is not None:
+                self.storage.record_borrow(
+                    member_id, isbn, due_date.isoformat(), book.available_quantity
+                )
+            if self.completer is not None:
+                words = completion_words(book.title, book.author)
+                self.completer.borrow(isbn, words)
+            print(f"{book.title} borrowed by {member}, due back on {due_date}")
 
     def return_book(self, member_id, isbn):
-        member = self.find_member(member_id)
-        if member is None:
-            print("Member not found.")
-            return
-        book = self.find_book(isbn)
-        if book is None:
-            print("Book not found.")
-            return
-        if book not in member.books_borrowed:
-            print("Book not borrowed by member.")
+        isbn = catalog_isbn(isbn)
+        book_lock = self.book_locks.for_key(isbn)
+        with book_lock, self.member_locks.for_key(member_id):
+            member = self.find_member(member_id)
+            if member is None:
+                print("Member not found.")
+                return
+            book = self.find_book(isbn)
+            if book is None:
+                print("Book not found.")
+                return
+            if self.loans.count(member_id, isbn) == 0:
+                print("Book not borrowed by member.")
+                return
+
+            book.available_quantity += 1
+            due_date = self.loans.remove(member_id, isbn)
+            if self.loans.count(member_id, isbn) == 0:
+                member.books_borrowed.discard(isbn)
+            if self.storage is not None:
+                self.storage.record_return(
+                    member_id, isbn, due_date.isoformat(), book.available_quantity
+                )
+            print(f"{book.title} returned by {member}")
+
+    def display_overdue_loans(self, today=None):
+        today = today or date.today()
+        overdue = self.loans.overdue(today)
+        if not overdue:
+            print("No overdue loans.")
             return
+        print("Overdue loans:")
+        for due_date, member_id, isbn in sorted(overdue):
+            days = (today - due_date).days
+            book, member = self.find_book(isbn), self.find_member(member_id)
+            print(f"{book.title} borrowed by {member} - {days} days overdue")
 
-        book.available_quantity += 1
-        member.books_borrowed.remove(book)
-        print(f"{book.title} returned by {member}")
+
+def import_books_from_file(library, path):
+    def show_progress(totals):
+        print(f"{totals['read']:,} records read...")
+
+    try:
+        file, books = open_catalog(path)
+    except OSError as error:
+        print(f"Could not open {path}: {error}")
+        return
+    with file:
+        try:
+            totals = import_catalog(library, books, progress=show_progress)
+        except (csv.Error, UnicodeDecodeError) as error:
+            # Batches before the unreadable part have already been saved
+            print(f"Import stopped, {path} could not be read: {error}")
+            return
+    print(
+        f"Import finished: {totals['added']:,} books added, "
+        f"{totals['merged']:,} merged into existing books, "
+        f"{totals['rejected']:,} records rejected."
+    )
 
 
 def main():
-    library = Library()
+    storage = LibraryDatabase(DATABASE_FILE)
+    library = Library(storage)
 
     while True:
         print("\nLibrary Book Management System")
@@ -108,10 +490,16 @@ def main():
         print("4. Display all members")
         print("5. Borrow a book")
         print("6. Return a book")
-        print("7. Exit")
+        print("7. Remove a book")
+        print("8. Remove a member")
+        print("9. Search books by title or author")
+        print("10. Show overdue loans")
+        print("11. Import books from a CSV or MARC file")
+        print("12. Suggest books from the start of a title or author")
+        print("13. Exit")
         print()
 
-        choice = input("Enter your choice (1-7): ")
+        choice = input("Enter your choice (1-13): ")
 
         if choice == "1":
             title = input("Enter the title of the book: ")
@@ -144,7 +532,31 @@ def main():
             library.return_book(member_id, isbn)
 
         elif choice == "7":
+            isbn = input("Enter the ISBN of the book to remove: ")
+            library.remove_book(isbn)
+
+        elif choice == "8":
+            member_id = input("Enter the ID of the member to remove: ")
+            library.remove_member(member_id)
+
+        elif choice == "9":
+            text = input("Enter a title or author to search for: ")
+            library.search_books(text)
+
+        elif choice == "10":
+            library.display_overdue_loans()
+
+        elif choice == "11":
+            path = input("Enter the path of the catalog file: ")
+            import_books_from_file(library, path)
+
+        elif choice == "12":
+            text = input("Start typing a title or author: ")
+            library.display_suggestions(text)
+
+        elif choice == "13":
             print("Exiting the Library Book Management System.")
+            storage.close()
             break
 
         else:
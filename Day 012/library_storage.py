@@ -0,0 +1,254 @@
+import re
+import sqlite3
+import threading
+from itertools import islice
+
+TITLE_WORD = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    isbn TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    author_key TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    available_quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS books_by_author ON books (author_key);
+
+-- Full-text index over the titles, reading the text from the books table
+CREATE VIRTUAL TABLE IF NOT EXISTS book_titles USING fts5(
+    title, content='books', content_rowid='rowid'
+);
+
+CREATE TABLE IF NOT EXISTS members (
+    member_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS loans (
+    member_id TEXT NOT NULL,
+    isbn TEXT NOT NULL,
+    due_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS loans_by_member ON loans (member_id, isbn);
+CREATE INDEX IF NOT EXISTS loans_by_isbn ON loans (isbn);
+
+-- How many times each book has been borrowed, for ranking suggestions
+CREATE TABLE IF NOT EXISTS borrow_counts (
+    isbn TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+"""
+
+# The SQL text is kept in constants so sqlite3's statement cache compiles each
+# statement once and reuses the prepared statement afterwards.
+BOOK_COLUMNS = "title, author, isbn, quantity, available_quantity"
+SELECT_BOOK = f"SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ?"
+SELECT_ALL_BOOKS = f"SELECT {BOOK_COLUMNS} FROM books ORDER BY title"
+SELECT_BOOKS_BY_AUTHOR = f"SELECT {BOOK_COLUMNS} FROM books WHERE author_key = ?"
+INSERT_BOOK = (
+    "INSERT INTO books (title, author, author_key, isbn, quantity, available_quantity)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+UPDATE_QUANTITIES = (
+    "UPDATE books SET quantity = ?, available_quantity = ? WHERE isbn = ?"
+)
+DELETE_BOOK = "DELETE FROM books WHERE isbn = ?"
+INDEX_TITLE = (
+    "INSERT INTO book_titles (rowid, title)"
+    " SELECT rowid, title FROM books WHERE isbn = ?"
+)
+INDEX_TITLES_AFTER = (
+    "INSERT INTO book_titles (rowid, title)"
+    " SELECT rowid, title FROM books WHERE rowid > ?"
+)
+UNINDEX_TITLE = (
+    "INSERT INTO book_titles (book_titles, rowid, title)"
+    " SELECT 'delete', rowid, title FROM books WHERE isbn = ?"
+)
+SELECT_LAST_ROWID = "SELECT coalesce(max(rowid), 0) FROM books"
+SELECT_BOOKS_BY_TITLE = (
+    f"SELECT {BOOK_COLUMNS} FROM books WHERE rowid IN"
+    " (SELECT rowid FROM book_titles WHERE book_titles MATCH ?)"
+)
+SELECT_MEMBER = "SELECT name, member_id FROM members WHERE member_id = ?"
+SELECT_ALL_MEMBERS = "SELECT name, member_id FROM members ORDER BY name"
+INSERT_MEMBER = "INSERT INTO members (name, member_id) VALUES (?, ?)"
+DELETE_MEMBER = "DELETE FROM members WHERE member_id = ?"
+INSERT_LOAN = "INSERT INTO loans (member_id, isbn, due_date) VALUES (?, ?, ?)"
+DELETE_LOAN = (
+    "DELETE FROM loans WHERE rowid = (SELECT rowid FROM loans"
+    " WHERE member_id = ? AND isbn = ? AND due_date = ? LIMIT 1)"
+)
+SELECT_ALL_LOANS = "SELECT member_id, isbn, due_date FROM loans"
+SELECT_MEMBER_ISBNS = "SELECT DISTINCT isbn FROM loans WHERE member_id = ?"
+UPDATE_AVAILABLE = "UPDATE books SET available_quantity = ? WHERE isbn = ?"
+ADD_QUANTITIES = (
+    "UPDATE books SET quantity = quantity + ?,"
+    " available_quantity = available_quantity + ? WHERE isbn = ?"
+)
+COUNT_BORROW = (
+    "INSERT INTO borrow_counts (isbn, count) VALUES (?, 1)"
+    " ON CONFLICT (isbn) DO UPDATE SET count = count + 1"
+)
+DELETE_BORROW_COUNT = "DELETE FROM borrow_counts WHERE isbn = ?"
+SELECT_COMPLETIONS = (
+    "SELECT isbn, title, author, coalesce(count, 0)"
+    " FROM books LEFT JOIN borrow_counts USING (isbn)"
+)
+PARAMETERS_PER_QUERY = 900  # stays under SQLite's limit on query parameters
+
+
+def title_words(title):
+    return set(TITLE_WORD.findall(title.lower()))
+
+
+def normalize_author(author):
+    return " ".join(author.lower().split())
+
+
+def book_row(title, author, isbn, quantity, available_quantity):
+    author_key = normalize_author(author)
+    return title, author, author_key, isbn, quantity, available_quantity
+
+
+class LibraryDatabase:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
+        self.connection.executescript(SCHEMA)
+
+    @property
+    def connection(self):
+        # Each thread gets its own connection so transactions never interleave.
+        # WAL lets readers carry on while another thread commits a write.
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            # check_same_thread is off only so close() can close every connection
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            with self.connections_lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self):
+        with self.connections_lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+    def load_book(self, isbn):
+        return self.connection.execute(SELECT_BOOK, (isbn,)).fetchone()
+
+    def iter_books(self):
+        return self.connection.execute(SELECT_ALL_BOOKS)
+
+    def find_books_by_author(self, author):
+        cursor = self.connection.execute(
+            SELECT_BOOKS_BY_AUTHOR, (normalize_author(author),)
+        )
+        return cursor.fetchall()
+
+    def find_books_by_title(self, title):
+        words = title_words(title)
+        if not words:
+            return []
+        # Quote every word so FTS never reads it as part of its query syntax
+        query = " AND ".join(f'"{word}"' for word in words)
+        return self.connection.execute(SELECT_BOOKS_BY_TITLE, (query,)).fetchall()
+
+    def add_book(self, title, author, isbn, quantity, available_quantity):
+        with self.connection:
+            self.connection.execute(
+                INSERT_BOOK, book_row(title, author, isbn, quantity, available_quantity)
+            )
+            self.connection.execute(INDEX_TITLE, (isbn,))
+
+    def import_books(self, books, batch_size=50000):
+        # books yields (title, author, isbn, quantity) tuples
+        books = iter(books)
+        imported = 0
+        while True:
+            batch = list(islice(books, batch_size))
+            if not batch:
+                return imported
+            with self.connection:
+                (last_rowid,) = self.connection.execute(SELECT_LAST_ROWID).fetchone()
+                self.connection.executemany(
+                    INSERT_BOOK,
+                    (
+                        book_row(title, author, isbn, quantity, quantity)
+                        for title, author, isbn, quantity in batch
+                    ),
+                )
+                # New rows get rowids above the old maximum, index them in one go
+                self.connection.execute(INDEX_TITLES_AFTER, (last_rowid,))
+            imported += len(batch)
+
+    def existing_isbns(self, isbns):
+        existing = set()
+        for start in range(0, len(isbns), PARAMETERS_PER_QUERY):
+            chunk = isbns[start : start + PARAMETERS_PER_QUERY]
+            placeholders = ", ".join("?" * len(chunk))
+            query = f"SELECT isbn FROM books WHERE isbn IN ({placeholders})"
+            existing.update(isbn for (isbn,) in self.connection.execute(query, chunk))
+        return existing
+
+    def add_quantities(self, additions):
+        # additions yields (quantity, available quantity, isbn) increases
+        with self.connection:
+            self.connection.executemany(ADD_QUANTITIES, additions)
+
+    def update_quantities(self, isbn, quantity, available_quantity):
+        with self.connection:
+            self.connection.execute(
+                UPDATE_QUANTITIES, (quantity, available_quantity, isbn)
+            )
+
+    def remove_book(self, isbn):
+        with self.connection:
+            self.connection.execute(UNINDEX_TITLE, (isbn,))
+            self.connection.execute(DELETE_BOOK, (isbn,))
+            self.connection.execute(DELETE_BORROW_COUNT, (isbn,))
+
+    def iter_completions(self):
+        # (ISBN, title, author, times borrowed) for every book
+        return self.connection.execute(SELECT_COMPLETIONS)
+
+    def load_member(self, member_id):
+        return self.connection.execute(SELECT_MEMBER, (member_id,)).fetchone()
+
+    def iter_members(self):
+        return self.connection.execute(SELECT_ALL_MEMBERS)
+
+    def add_member(self, name, member_id):
+        with self.connection:
+            self.connection.execute(INSERT_MEMBER, (name, member_id))
+
+    def remove_member(self, member_id):
+        with self.connection:
+            self.connection.execute(DELETE_MEMBER, (member_id,))
+
+    def borrowed_isbns(self, member_id):
+        cursor = self.connection.execute(SELECT_MEMBER_ISBNS, (member_id,))
+        return {isbn for (isbn,) in cursor}
+
+    def iter_loans(self):
+        return self.connection.execute(SELECT_ALL_LOANS)
+
+    def record_borrow(self, member_id, isbn, due_date, available_quantity):
+        with self.connection:
+            self.connection.execute(INSERT_LOAN, (member_id, isbn, due_date))
+            self.connection.execute(UPDATE_AVAILABLE, (available_quantity, isbn))
+            self.connection.execute(COUNT_BORROW, (isbn,))
+
+    def record_return(self, member_id, isbn, due_date, available_quantity):
+        with self.connection:
+            self.connection.execute(DELETE_LOAN, (member_id, isbn, due_date))
+            self.connection.execute(UPDATE_AVAILABLE, (available_quantity, isbn))
@@ -0,0 +1,93 @@
+import secrets
+import threading
+
+BODY_DIGITS = 9  # plus one Luhn check digit makes 10, as before
+BODY_LIMIT = 10**BODY_DIGITS
+HALF_BITS = 15  # two 15-bit halves cover 2**30, just above 10**9
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+def luhn_digits(chunk, doubled):
+    # Luhn sum of a 3-digit chunk; doubled says which of its digits are doubled
+    total = 0
+    for digit, double in zip(f"{chunk:03d}", doubled):
+        digit = int(digit)
+        if double:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total
+
+
+# A 9-digit body is three 3-digit chunks. Counting from the check digit, every
+# other digit is doubled: the outer digits of the first and last chunk and the
+# middle digit of the middle chunk. Summing chunks from a table is much faster
+# than summing nine digits one by one.
+OUTER_DOUBLED = [luhn_digits(chunk, (True, False, True)) for chunk in range(1000)]
+MIDDLE_DOUBLED = [luhn_digits(chunk, (False, True, False)) for chunk in range(1000)]
+
+
+def add_check_digit(body):
+    total = (
+        OUTER_DOUBLED[body // 1_000_000]
+        + MIDDLE_DOUBLED[body // 1000 % 1000]
+        + OUTER_DOUBLED[body % 1000]
+    )
+    return body * 10 + (10 - total % 10) % 10
+
+
+def is_valid_account_number(account_number):
+    return (
+        len(account_number) == BODY_DIGITS + 1
+        and account_number.isdigit()
+        and add_check_digit(int(account_number) // 10) == int(account_number)
+    )
+
+
+class AccountNumberAllocator:
+    """Hands out unique 10-digit account numbers that look random.
+
+    The n-th number is a shuffled version of n: a Feistel network, keyed with
+    a secret, rearranges the numbers below 2**30, and any result of 10**9 or
+    more is shuffled again until it fits ("cycle walking"). Because the
+    shuffle is a permutation, different counters can never give the same
+    number, so nothing has to be checked against the existing accounts.
+    """
+
+    def __init__(self, key=None, counter=0):
+        self.key = secrets.randbits(64) if key is None else key
+        self.round_keys = [(self.key >> (16 * i)) & 0xFFFF for i in range(ROUNDS)]
+        self.counter = counter
+        self.lock = threading.Lock()
+
+    def shuffle(self, number):
+        left, right = number >> HALF_BITS, number & HALF_MASK
+        for round_key in self.round_keys:
+            mixed = ((right ^ round_key) * 0x9E3779B1) & 0xFFFFFFFF
+            left, right = right, left ^ (mixed >> 17)
+        return (left << HALF_BITS) | right
+
+    def body(self, counter):
+        number = self.shuffle(counter)
+        while number >= BODY_LIMIT:
+            number = self.shuffle(number)
+        return number
+
+    def reserve(self, count):
+        with self.lock:
+            start = self.counter
+            if start + count > BODY_LIMIT:
+                raise ValueError("No account numbers left")
+            self.counter += count
+        return start
+
+    def allocate(self):
+        return f"{add_check_digit(self.body(self.reserve(1))):010d}"
+
+    def allocate_many(self, count):
+        start = self.reserve(count)
+        body = self.body
+        return [
+            f"{add_check_digit(body(counter)):010d}"
+            for counter in range(start, start + count)
+        ]
@@ -1,49 +1,146 @@
-import random
-from datetime import datetime
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_EVEN, Decimal
 
+from account_numbers import AccountNumberAllocator
+from ledger import Ledger, Transaction  # Transaction is still importable from here
 
-class Transaction:
-    def __init__(self, amount, transaction_type, description):
-        self.amount = amount
-        self.transaction_type = transaction_type
-        self.description = description
-        self.timestamp = datetime.now()
 
-    def __str__(self):
-        return f"{self.timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {self.transaction_type}: ${self.amount:.2f} - {self.description}"
+def to_cents(amount):
+    # Dollars to whole cents, rounding halves to even ("banker's rounding")
+    cents = Decimal(str(amount)) * 100
+    return int(cents.to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+RATE_SCALE = 1_000_000  # interest rates are kept in millionths
+IDEMPOTENCY_TTL = 24 * 60 * 60  # seconds a payment's result is remembered
+
+
+def to_rate_units(rate):
+    return int((Decimal(str(rate)) * RATE_SCALE).to_integral_value())
+
+
+def start_of_day(day):
+    return datetime.combine(day, datetime.min.time()).timestamp()
+
+
+def commit(changes, journal=None, idempotency_key=None):
+    # changes is a list of (account, cents, transaction type, description) and
+    # the caller holds every one of those accounts' locks. With a journal the
+    # changes are first written to its log as one record, so after a crash
+    # either all of them are recovered or none are.
+    timestamp = time.time()
+    sequence = 0
+    if journal is not None:
+        sequence = journal.log_changes(changes, timestamp, idempotency_key)
+    for account, cents, transaction_type, description in changes:
+        account.record(cents, transaction_type, description, timestamp)
+        account.applied_sequence = max(account.applied_sequence, sequence)
+    return sequence
+
+
+def wait_until_saved(journal, sequence):
+    # Called after the account locks are released, so other threads can keep
+    # adding to the log while this one waits for the disk
+    if journal is not None:
+        journal.wait(sequence)
+
+
+def divide_half_even(numerator, denominator):
+    # Integer division that rounds halves to the even neighbour, without floats
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
 
 
 class BankAccount:
     def __init__(self, account_holder, account_number, initial_balance=0):
         self.account_holder = account_holder
         self.account_number = account_number
-        self.balance = initial_balance
-        self.transactions = []
+        # The balance lives in slot `slot` of an array of cents. On its own an
+        # account has a one-slot array; a Bank moves it into a shared column.
+        self.balances = array("q", [to_cents(initial_balance)])
+        self.slot = 0
+        self.transactions = Ledger(self.balance_cents)
+        # Every change to the balance happens under this lock. It is reentrant
+        # so a transfer can hold it while calling withdraw or deposit.
+        self.lock = threading.RLock()
+        self.journal = None  # where changes are logged, once a saved bank has it
+        self.applied_sequence = 0  # the last logged change included in the balance
+
+    @property
+    def balance_cents(self):
+        return self.balances[self.slot]
+
+    @balance_cents.setter
+    def balance_cents(self, cents):
+        self.balances[self.slot] = cents
+
+    @property
+    def balance(self):
+        return self.balance_cents / 100
+
+    def move_balance_to(self, balances):
+        balances.append(self.balance_cents)
+        self.balances, self.slot = balances, len(balances) - 1
+
+    def record(self, amount_cents, transaction_type, description, timestamp=None):
+        self.balance_cents += amount_cents
+        self.transactions.append(amount_cents, transaction_type, description, timestamp)
+
+    def can_withdraw(self, amount_cents):
+        return 0 < amount_cents <= self.balance_cents
 
     def deposit(self, amount, description="Deposit"):
-        if amount > 0:
-            self.balance += amount
-            self.transactions.append(Transaction(amount, "Deposit", description))
-            return True
-        return False
+        amount_cents = to_cents(amount)
+        if amount_cents <= 0:
+            return False
+        with self.lock:
+            change = (self, amount_cents, "Deposit", description)
+            sequence = commit([change], self.journal)
+        wait_until_saved(self.journal, sequence)
+        return True
 
     def withdraw(self, amount, description="Withdrawal"):
-        if 0 < amount <= self.balance:
-            self.balance -= amount
-            self.transactions.append(Transaction(amount, "Withdrawal", description))
-            return True
-        return False
+        amount_cents = to_cents(amount)
+        with self.lock:
+            if not self.can_withdraw(amount_cents):
+                return False
+            change = (self, -amount_cents, "Withdrawal", description)
+            sequence = commit([change], self.journal)
+        wait_until_saved(self.journal, sequence)
+        return True
 
     def get_balance(self):
         return self.balance
 
-    def print_statement(self):
+    def balance_on(self, day):
+        # The balance at the end of day, found from the ledger's checkpoints
+        end = start_of_day(day + timedelta(days=1))
+        return self.transactions.balance_before(end) / 100
+
+    def print_statement(self, start_date=None, end_date=None):
         print(
             f"\nAccount Statement for {self.account_holder} (Account: {self.account_number})"
         )
-        print(f"Current Balance: ${self.balance:.2f}")
+        if start_date is None:
+            print(f"Current Balance: ${self.balance:.2f}")
+            transactions = iter(self.transactions)
+        else:
+            start = start_of_day(start_date)
+            end = start_of_day(end_date + timedelta(days=1))
+            opening = self.transactions.balance_before(start) / 100
+            print(f"Period: {start_date} to {end_date}")
+            print(f"Opening Balance: ${opening:.2f}")
+            print(f"Closing Balance: ${self.balance_on(end_date):.2f}")
+            transactions = self.transactions.entries_between(start, end)
         print("\nTransaction History:")
-        for transaction in self.transactions:
+        for transaction in transactions:
             print(transaction)
 
 
@@ -52,12 +149,32 @@ class SavingsAccount(BankAccount):
         self, account_holder, account_number, initial_balance=0, interest_rate=0.01
     ):
         super().__init__(account_holder, account_number, initial_balance)
-        self.interest_rate = interest_rate
+        # Kept like the balance: in millionths, in a slot of an array
+        self.rates = array("q", [to_rate_units(interest_rate)])
+        self.rate_slot = 0
+
+    @property
+    def interest_rate(self):
+        return self.rates[self.rate_slot] / RATE_SCALE
+
+    @interest_rate.setter
+    def interest_rate(self, rate):
+        self.rates[self.rate_slot] = to_rate_units(rate)
+
+    def move_rate_to(self, rates):
+        rates.append(self.rates[self.rate_slot])
+        self.rates, self.rate_slot = rates, len(rates) - 1
 
     def apply_interest(self):
-        interest = self.balance * self.interest_rate
-        self.deposit(interest, "Interest")
-        return interest
+        rate = self.rates[self.rate_slot]
+        sequence = 0
+        with self.lock:
+            interest_cents = divide_half_even(self.balance_cents * rate, RATE_SCALE)
+            if interest_cents > 0:
+                change = (self, interest_cents, "Deposit", "Interest")
+                sequence = commit([change], self.journal)
+        wait_until_saved(self.journal, sequence)
+        return interest_cents / 100
 
 
 class CheckingAccount(BankAccount):
@@ -67,18 +184,82 @@ class CheckingAccount(BankAccount):
         super().__init__(account_holder, account_number, initial_balance)
         self.overdraft_limit = overdraft_limit
 
-    def withdraw(self, amount, description="Withdrawal"):
-        if 0 < amount <= (self.balance + self.overdraft_limit):
-            self.balance -= amount
-            self.transactions.append(Transaction(amount, "Withdrawal", description))
-            return True
-        return False
+    def can_withdraw(self, amount_cents):
+        overdraft_cents = to_cents(self.overdraft_limit)
+        return 0 < amount_cents <= (self.balance_cents + overdraft_cents)
+
+
+class IdempotencyEntry:
+    def __init__(self, expires):
+        self.expires = expires
+        self.done = threading.Event()
+        self.result = None
+
+
+class IdempotencyCache:
+    # Remembers the result of each request key for ttl seconds, keeping at most
+    # max_size keys. A retried request gets the first result back instead of
+    # being carried out again, even while the first one is still running.
+    def __init__(self, max_size=100_000, ttl=IDEMPOTENCY_TTL):
+        self.entries = OrderedDict()  # key -> IdempotencyEntry, oldest first
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+    def run(self, key, operation):
+        now = time.monotonic()
+        with self.lock:
+            # Every entry lives for the same ttl, so the oldest expire first
+            while self.entries and next(iter(self.entries.values())).expires <= now:
+                self.entries.popitem(last=False)
+            entry = self.entries.get(key)
+            first_request = entry is None
+            if first_request:
+                entry = self.entries[key] = IdempotencyEntry(now + self.ttl)
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+        if not first_request:
+            entry.done.wait()
+            return entry.result
+        try:
+            entry.result = operation()
+        except Exception:
+            # Nothing happened, so a retry should be allowed to try again
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            raise
+        finally:
+            entry.done.set()
+        return entry.result
+
+    def remember(self, key, result):
+        # Used when a saved bank is loaded, so retries after a restart are
+        # still recognised
+        entry = IdempotencyEntry(time.monotonic() + self.ttl)
+        entry.result = result
+        entry.done.set()
+        with self.lock:
+            self.entries[key] = entry
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
 
 
 class Bank:
     def __init__(self, name):
         self.name = name
         self.accounts = {}
+        # Every account's balance, one slot each, plus the slots and rates of
+        # the savings accounts, so month-end interest is one pass over arrays
+        self.balances = array("q")
+        self.savings_accounts = []
+        self.savings_slots = array("Q")
+        self.savings_rates = array("q")
+        self.lock = threading.Lock()  # guards opening accounts and the arrays
+        self.idempotency = IdempotencyCache()
+        self.account_numbers = AccountNumberAllocator()
+        self.journal = None  # set by BankStore when the bank is saved to disk
 
     def create_account(self, account_type, account_holder, initial_balance=0):
         account_number = self.generate_account_number()
@@ -89,92 +270,116 @@ class Bank:
         else:
             return None
 
-        self.accounts[account_number] = account
+        self.open_account(account)
         return account
 
+    def open_account(self, account):
+        sequence = 0
+        with self.lock:
+            if self.journal is not None:
+                sequence = self.journal.log_open(account, self.account_numbers.counter)
+                account.applied_sequence = sequence
+            account.journal = self.journal
+            account.move_balance_to(self.balances)
+            if isinstance(account, SavingsAccount):
+                self.savings_accounts.append(account)
+                self.savings_slots.append(account.slot)
+                account.move_rate_to(self.savings_rates)
+            self.accounts[account.account_number] = account
+        wait_until_saved(self.journal, sequence)
+
+    def apply_monthly_interest(self):
+        # Interest for every savings account in integer cents, rounded half to
+        # even, computed in one pass over the balance and rate arrays
+        with self.lock:
+            # Every savings account stays locked from reading its balance to
+            # paying the interest, so no withdrawal can land in between. The
+            # locks are taken in account-number order, like transfers take
+            # theirs, so the two can never deadlock.
+            locks = [
+                account.lock
+                for account in sorted(
+                    self.savings_accounts, key=lambda a: a.account_number
+                )
+            ]
+            for lock in locks:
+                lock.acquire()
+            try:
+                sequence, total = self.pay_interest()
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        wait_until_saved(self.journal, sequence)
+        return total / 100
+
+    def pay_interest(self):
+        # The caller holds the bank lock and every savings account's lock
+        balances = self.balances
+        interest = [
+            divide_half_even(balances[slot] * rate, RATE_SCALE)
+            for slot, rate in zip(self.savings_slots, self.savings_rates)
+        ]
+        savings = zip(self.savings_accounts, self.savings_slots, interest)
+        changes = [
+            (account, slot, cents) for account, slot, cents in savings if cents > 0
+        ]
+        # The whole run is logged as one record, with exactly the amounts
+        # credited below, then the balances and ledgers are updated, all with
+        # the same timestamp
+        now = time.time()
+        sequence = 0
+        if self.journal is not None:
+            logged = [
+                (account, cents, "Deposit", "Interest") for account, _, cents in changes
+            ]
+            sequence = self.journal.log_changes(logged, now)
+        total = 0
+        for account, slot, cents in changes:
+            balances[slot] += cents
+            account.transactions.append(cents, "Deposit", "Interest", now)
+            account.applied_sequence = max(account.applied_sequence, sequence)
+            total += cents
+        return sequence, total
+
+    def transfer(self, from_number, to_number, amount, idempotency_key=None):
+        if idempotency_key is None:
+            return self.move_money(from_number, to_number, amount)
+        return self.idempotency.run(
+            idempotency_key,
+            lambda: self.move_money(from_number, to_number, amount, idempotency_key),
+        )
+
+    def move_money(self, from_number, to_number, amount, idempotency_key=None):
+        source = self.get_account(from_number)
+        target = self.get_account(to_number)
+        if source is None or target is None or source is target:
+            return False
+        amount_cents = to_cents(amount)
+        # Both accounts are locked in account-number order, so two transfers
+        # going opposite ways between the same accounts can never deadlock
+        first, second = sorted((source, target), key=lambda a: a.account_number)
+        with first.lock, second.lock:
+            if not source.can_withdraw(amount_cents):
+                return False
+            changes = [
+                (source, -amount_cents, "Withdrawal", f"Transfer to {to_number}"),
+                (target, amount_cents, "Deposit", f"Transfer from {from_number}"),
+            ]
+            sequence = commit(changes, self.journal, idempotency_key)
+        wait_until_saved(self.journal, sequence)
+        return True
+
     def generate_account_number(self):
-        return "".join([str(random.randint(0, 9)) for _ in range(10)])
+        return self.account_numbers.allocate()
 
     def get_account(self, account_number):
         return self.accounts.get(account_number)
 
 
-def main():
-    bank = Bank("PyBank")
-
-    while True:
-        print("\nPyBank Account Simulator")
-        print("1. Create a new account")
-        print("2. Access existing account")
-        print("3. Exit")
-
-        choice = input("Enter your choice (1-3): ")
-
-        if choice == "1":
-            account_holder = input("Enter account holder name: ")
-            account_type = input("Enter account type (savings/checking): ").lower()
-            initial_balance = float(input("Enter initial balance: "))
-
-            account = bank.create_account(account_type, account_holder, initial_balance)
-            if account:
-                print(
-                    f"Account created successfully. Your account number is: {account.account_number}"
-                )
-            else:
-                print("Invalid account type. Please try again.")
-
-        elif choice == "2":
-            account_number = input("Enter your account number: ")
-            account = bank.get_account(account_number)
-
-            if account:
-                while True:
-                    print(f"\nWelcome, {account.account_holder}")
-                    print("1. Check balance")
-                    print("2. Deposit")
-                    print("3. Withdraw")
-                    print("4. Print statement")
-                    print("5. Apply interest (Savings Account)")
-                    print("6. Return to main menu")
-
-                    action = input("Enter your choice (1-6): ")
-
-                    if action == "1":
-                        print(f"Your current balance is: ${account.get_balance():.2f}")
-                    elif action == "2":
-                        amount = float(input("Enter deposit amount: "))
-                        if account.deposit(amount):
-                            print("Deposit successful")
-                        else:
-                            print("Invalid deposit amount")
-                    elif action == "3":
-                        amount = float(input("Enter withdrawal amount: "))
-                        if account.withdraw(amount):
-                            print("Withdrawal successful")
-                        else:
-                            print("Insufficient funds or invalid amount")
-                    elif action == "4":
-                        account.print_statement()
-                    elif action == "5":
-                        if isinstance(account, SavingsAccount):
-                            interest = account.apply_interest()
-                            print(f"Interest applied: ${interest:.2f}")
-                        else:
-                            print("This feature is only available for Savings Accounts")
-                    elif action == "6":
-                        break
-                    else:
-                        print("Invalid choice. Please try again.")
-            else:
-                print("Account not found. Please try again.")
-
-        elif choice == "3":
-            print("Thank you for using PyBank Account Simulator. Goodbye!")
-            break
-
-        else:
-            print("Invalid choice. Please try again.")
-
-
 if __name__ == "__main__":
+    # The menu lives in pybank.py, which imports this module, so running this
+    # file directly hands over to it rather than defining a second copy of
+    # every class under __main__
+    from pybank import main
+
     main()
@@ -0,0 +1,401 @@
+import json
+import os
+import pickle
+import threading
+import time
+import zlib
+from array import array
+
+from account_numbers import AccountNumberAllocator
+from bank_account import Bank, BankAccount, CheckingAccount, SavingsAccount
+from ledger import DESCRIPTIONS, Ledger
+
+SNAPSHOT_FILE = "snapshot.pickle"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+ACCOUNT_KINDS = {"savings": SavingsAccount, "checking": CheckingAccount}
+
+
+def segment_name(first_sequence):
+    return f"{SEGMENT_PREFIX}{first_sequence:012d}{SEGMENT_SUFFIX}"
+
+
+def first_sequence_of(segment):
+    return int(segment[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+
+
+def encode_record(record):
+    # One JSON line per record, led by its CRC32 so a half-written last line is
+    # recognised after a crash
+    line = json.dumps(record, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(line), line)
+
+
+def read_records(path):
+    # Yields (record, end offset) for every complete record, stopping at the
+    # first line that is cut short or does not match its checksum
+    with open(path, "rb") as file:
+        offset = 0
+        for line in file:
+            if not line.endswith(b"\n") or len(line) < 10:
+                return
+            checksum, body = line[:8], line[9:-1]
+            try:
+                if int(checksum, 16) != zlib.crc32(body):
+                    return
+                record = json.loads(body)
+            except ValueError:
+                return
+            offset += len(line)
+            yield record, offset
+
+
+def fsync_directory(directory):
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def account_kind(account):
+    for kind, account_class in ACCOUNT_KINDS.items():
+        if isinstance(account, account_class):
+            return kind
+    return "basic"
+
+
+def account_settings(account):
+    if isinstance(account, SavingsAccount):
+        return account.rates[account.rate_slot]
+    if isinstance(account, CheckingAccount):
+        return account.overdraft_limit
+    return None
+
+
+def make_account(kind, holder, number, balance_cents, settings):
+    if kind == "savings":
+        account = SavingsAccount(holder, number)
+        account.rates[account.rate_slot] = settings
+    elif kind == "checking":
+        account = CheckingAccount(holder, number, overdraft_limit=settings)
+    else:
+        account = BankAccount(holder, number)
+    account.balance_cents = balance_cents
+    account.transactions = Ledger(balance_cents)
+    return account
+
+
+class WriteAheadLog:
+    """Appends records to numbered segment files and makes them durable.
+
+    With group commit, a thread that needs its record on disk either calls
+    fsync itself or, if another thread is already doing so, waits for that
+    fsync and then checks again. While one fsync runs, other threads keep
+    appending, and the next fsync covers all of their records at once, so
+    many writers share each trip to the disk.
+    """
+
+    def __init__(self, directory, next_sequence, segment_start, group_commit=True):
+        self.directory = directory
+        self.next_sequence = next_sequence
+        self.group_commit = group_commit
+        self.written = next_sequence - 1  # the last record handed to the file
+        self.durable = next_sequence - 1  # the last record known to be on disk
+        self.syncing = False
+        self.condition = threading.Condition()
+        self.segment_start = segment_start
+        self.file = open(os.path.join(directory, segment_name(segment_start)), "ab")
+
+    def append(self, record):
+        with self.condition:
+            sequence = self.next_sequence
+            self.file.write(encode_record([sequence] + record))
+            self.next_sequence += 1
+            self.written = sequence
+            if not self.group_commit:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.durable = sequence
+            return sequence
+
+    def wait(self, sequence):
+        with self.condition:
+            while self.durable < sequence:
+                if self.syncing:
+                    self.condition.wait()
+                    continue
+                # Become the thread that syncs, for everything written so far
+                self.syncing = True
+                target = self.written
+                self.file.flush()
+                descriptor = self.file.fileno()
+                self.condition.release()
+                synced = False
+                try:
+                    os.fsync(descriptor)
+                    synced = True
+                finally:
+                    self.condition.acquire()
+                    self.syncing = False
+                    if synced:
+                        self.durable = max(self.durable, target)
+                    self.condition.notify_all()
+
+    def rotate(self):
+        # Finishes the current segment and starts a new one at next_sequence
+        with self.condition:
+            while self.syncing:
+                self.condition.wait()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.durable = self.written
+            self.segment_start = self.next_sequence
+            path = os.path.join(self.directory, segment_name(self.segment_start))
+            self.file = open(path, "ab")
+            fsync_directory(self.directory)
+            return self.segment_start
+
+    def close(self):
+        with self.condition:
+            while self.syncing:
+                self.condition.wait()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+class BankStore:
+    """Keeps a Bank on disk with a write-ahead log and snapshots.
+
+    Every change is written to the log before it is applied, and the caller is
+    only told it worked once the log is on disk. Every snapshot_every records
+    a snapshot of all accounts is written in the background and older log
+    segments are deleted. Opening the store loads the last snapshot and
+    replays the log written after it.
+    """
+
+    def __init__(self, directory, group_commit=True, snapshot_every=100_000):
+        self.directory = directory
+        self.group_commit = group_commit
+        self.snapshot_every = snapshot_every
+        self.snapshot_sequence = 0
+        self.snapshot_lock = threading.Lock()  # one snapshot at a time
+        self.bank = None
+        self.wal = None
+
+    def segments(self):
+        names = [
+            name
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        ]
+        return sorted(names)
+
+    def open(self, name="PyBank"):
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as file:
+                state = pickle.load(file)
+            bank = self.restore(state)
+            self.snapshot_sequence = state["sequence"]
+        else:
+            # The first snapshot saves the account number key straight away
+            bank = Bank(name)
+            self.write_snapshot(self.capture(bank, 1))
+            self.snapshot_sequence = 1
+
+        last_sequence = self.replay(bank)
+        next_sequence = max(last_sequence + 1, self.snapshot_sequence)
+        segments = self.segments()
+        if segments:
+            segment_start = first_sequence_of(segments[-1])
+        else:
+            segment_start = next_sequence
+        self.wal = WriteAheadLog(
+            self.directory, next_sequence, segment_start, self.group_commit
+        )
+
+        bank.journal = self
+        for account in bank.accounts.values():
+            account.journal = self
+        self.bank = bank
+        return bank
+
+    def replay(self, bank):
+        # Applies every logged record the snapshot does not already include
+        last_sequence = 0
+        segments = self.segments()
+        for position, name in enumerate(segments):
+            path = os.path.join(self.directory, name)
+            valid_length = 0
+            for record, valid_length in read_records(path):
+                last_sequence = record[0]
+                if record[0] >= self.snapshot_sequence:
+                    self.apply(bank, record)
+            if valid_length < os.path.getsize(path):
+                if position != len(segments) - 1:
+                    raise ValueError(f"{name} is damaged before its end")
+                # The crash cut the last record short; it was never confirmed
+                with open(path, "r+b") as file:
+                    file.truncate(valid_length)
+                    os.fsync(file.fileno())
+        return last_sequence
+
+    def apply(self, bank, record):
+        sequence, timestamp, operation = record[:3]
+        if operation == "open":
+            kind, holder, number, balance_cents, settings, counter = record[3:]
+            if number not in bank.accounts:
+                account = make_account(kind, holder, number, balance_cents, settings)
+                account.applied_sequence = sequence
+                bank.open_account(account)
+            allocator = bank.account_numbers
+            allocator.counter = max(allocator.counter, counter)
+        elif operation == "change":
+            changes, idempotency_key = record[3:]
+            for number, cents, transaction_type, description in changes:
+                account = bank.accounts[number]
+                if sequence > account.applied_sequence:
+                    account.record(cents, transaction_type, description, timestamp)
+                    account.applied_sequence = sequence
+            if idempotency_key is not None:
+                bank.idempotency.remember(idempotency_key, True)
+
+    def log_open(self, account, allocator_counter):
+        record = [
+            time.time(),
+            "open",
+            account_kind(account),
+            account.account_holder,
+            account.account_number,
+            account.balance_cents,
+            account_settings(account),
+            allocator_counter,
+        ]
+        return self.log(record)
+
+    def log_changes(self, changes, timestamp, idempotency_key=None):
+        entries = [
+            [account.account_number, cents, transaction_type, description]
+            for account, cents, transaction_type, description in changes
+        ]
+        return self.log([timestamp, "change", entries, idempotency_key])
+
+    def log(self, record):
+        sequence = self.wal.append(record)
+        if (
+            sequence - self.snapshot_sequence >= self.snapshot_every
+            and self.snapshot_lock.acquire(blocking=False)
+        ):
+            threading.Thread(target=self.snapshot_in_background, daemon=True).start()
+        return sequence
+
+    def wait(self, sequence):
+        self.wal.wait(sequence)
+
+    def snapshot_in_background(self):
+        try:
+            self.take_snapshot()
+        finally:
+            self.snapshot_lock.release()
+
+    def snapshot(self):
+        with self.snapshot_lock:
+            self.take_snapshot()
+
+    def take_snapshot(self):
+        # The bank lock stops accounts being opened and interest runs while
+        # accounts are copied; deposits and transfers carry on. Any change
+        # logged before the new segment started is finished by the time its
+        # account's lock can be taken, so the copy includes it.
+        with self.bank.lock:
+            sequence = self.wal.rotate()
+            state = self.capture(self.bank, sequence)
+        self.write_snapshot(state)
+        self.snapshot_sequence = sequence
+        for name in self.segments():
+            if name < segment_name(sequence):
+                os.remove(os.path.join(self.directory, name))
+
+    def capture(self, bank, sequence):
+        accounts = []
+        for account in list(bank.accounts.values()):
+            with account.lock:
+                ledger = account.transactions
+                accounts.append(
+                    {
+                        "kind": account_kind(account),
+                        "holder": account.account_holder,
+                        "number": account.account_number,
+                        "balance": account.balance_cents,
+                        "settings": account_settings(account),
+                        "applied_sequence": account.applied_sequence,
+                        "amounts": ledger.amounts[:],
+                        "types": ledger.types[:],
+                        "timestamps": ledger.timestamps[:],
+                        "descriptions": ledger.descriptions[:],
+                        "checkpoints": ledger.checkpoints[:],
+                    }
+                )
+        with bank.idempotency.lock:
+            payments = [
+                (key, entry.result)
+                for key, entry in bank.idempotency.entries.items()
+                if entry.done.is_set()
+            ]
+        return {
+            "name": bank.name,
+            "sequence": sequence,
+            "key": bank.account_numbers.key,
+            "counter": bank.account_numbers.counter,
+            "descriptions": list(DESCRIPTIONS.texts),
+            "accounts": accounts,
+            "payments": payments,
+        }
+
+    def write_snapshot(self, state):
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        fsync_directory(self.directory)
+
+    def restore(self, state):
+        bank = Bank(state["name"])
+        bank.account_numbers = AccountNumberAllocator(state["key"], state["counter"])
+        # Description numbers are only meaningful within one process
+        new_ids = [DESCRIPTIONS.intern(text) for text in state["descriptions"]]
+        renumber = new_ids != list(range(len(new_ids)))
+        for saved in state["accounts"]:
+            account = make_account(
+                saved["kind"],
+                saved["holder"],
+                saved["number"],
+                saved["balance"],
+                saved["settings"],
+            )
+            account.applied_sequence = saved["applied_sequence"]
+            ledger = account.transactions
+            ledger.amounts = saved["amounts"]
+            ledger.types = saved["types"]
+            ledger.timestamps = saved["timestamps"]
+            ledger.checkpoints = saved["checkpoints"]
+            descriptions = saved["descriptions"]
+            if renumber:
+                descriptions = array(
+                    "I", (new_ids[description] for description in descriptions)
+                )
+            ledger.descriptions = descriptions
+            bank.open_account(account)
+        for key, result in state["payments"]:
+            bank.idempotency.remember(key, result)
+        return bank
+
+    def close(self):
+        if self.wal is not None:
+            self.wal.close()
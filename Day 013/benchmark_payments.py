@@ -0,0 +1,101 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bank_account import Bank, CheckingAccount
+
+OPENING_BALANCE = 1000
+
+
+def build_bank(accounts):
+    bank = Bank("Benchmark Bank")
+    for number in range(accounts):
+        account_number = f"{number:010d}"
+        bank.open_account(CheckingAccount("Holder", account_number, OPENING_BALANCE))
+    return bank
+
+
+def payment_worker(bank, payments, accounts, authorization_delay, seed):
+    # Sends random transfers. About one in ten is a retry of an earlier
+    # payment with the same idempotency key, which must not move money twice.
+    rng = random.Random(seed)
+    keys = []
+    for number in range(payments):
+        if keys and rng.random() < 0.1:
+            key, from_number, to_number, amount = rng.choice(keys)
+        else:
+            from_number = f"{rng.randrange(accounts):010d}"
+            to_number = f"{rng.randrange(accounts):010d}"
+            amount = rng.randint(1, 20000) / 100
+            key = f"{seed}-{number}"
+            keys.append((key, from_number, to_number, amount))
+        if authorization_delay:
+            time.sleep(authorization_delay)  # stands in for a card network call
+        bank.transfer(from_number, to_number, amount, idempotency_key=key)
+
+
+def check_invariants(bank, accounts):
+    total = sum(account.balance_cents for account in bank.accounts.values())
+    assert total == accounts * OPENING_BALANCE * 100, "money was created or lost"
+    transfers = 0
+    for account in bank.accounts.values():
+        ledger = account.transactions
+        assert account.balance_cents == ledger.checkpoints[0] + sum(ledger.amounts)
+        assert account.balance_cents >= -account.overdraft_limit * 100
+        transfers += sum(1 for amount in ledger.amounts if amount < 0)
+    applied = sum(
+        1 for entry in bank.idempotency.entries.values() if entry.result is True
+    )
+    assert transfers == applied, "a retried payment was applied twice"
+
+
+def run_benchmark(
+    worker_counts=(1, 2, 4, 8, 16),
+    payments=4000,
+    accounts=200,
+    authorization_delay=0.001,
+):
+    label = (
+        f"{authorization_delay * 1000:g} ms authorization per payment"
+        if authorization_delay
+        else "no authorization delay"
+    )
+    print(f"\nPayment processor ({label}), {payments} payments per run")
+    baseline = None
+    for workers in worker_counts:
+        bank = build_bank(accounts)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    payment_worker,
+                    bank,
+                    payments // workers,
+                    accounts,
+                    authorization_delay,
+                    seed,
+                )
+                for seed in range(workers)
+            ]
+        elapsed = time.perf_counter() - start
+        for future in futures:
+            future.result()  # re-raises anything that went wrong in a worker
+        check_invariants(bank, accounts)
+
+        throughput = payments / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{workers:>2} workers: {throughput:>10,.0f} payments/sec "
+            f"({throughput / baseline:.2f}x), money conserved"
+        )
+
+
+def main():
+    run_benchmark()
+    # Without any waiting the work is pure Python, so the GIL keeps it on one
+    # core and more workers only add lock contention
+    run_benchmark(payments=40000, authorization_delay=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import random
+import tempfile
+import threading
+import time
+
+from bank_account import CheckingAccount
+from bank_storage import BankStore
+
+ACCOUNTS = 100
+
+
+def teller(bank, operations, seed):
+    rng = random.Random(seed)
+    for _ in range(operations):
+        from_number = f"{rng.randrange(ACCOUNTS):010d}"
+        to_number = f"{rng.randrange(ACCOUNTS):010d}"
+        bank.transfer(from_number, to_number, rng.randint(1, 5000) / 100)
+
+
+def run_benchmark(thread_counts=(1, 4, 16), operations=2000):
+    print(f"\nSaved bank, {operations} transfers per run")
+    for group_commit in (False, True):
+        label = "group commit" if group_commit else "fsync per op"
+        for threads in thread_counts:
+            with tempfile.TemporaryDirectory() as directory:
+                store = BankStore(directory, group_commit=group_commit)
+                bank = store.open("Benchmark Bank")
+                for number in range(ACCOUNTS):
+                    account = CheckingAccount("Holder", f"{number:010d}", 1000)
+                    bank.open_account(account)
+                workers = [
+                    threading.Thread(
+                        target=teller, args=(bank, operations // threads, seed)
+                    )
+                    for seed in range(threads)
+                ]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - start
+                store.close()
+
+            print(
+                f"{label:>13}, {threads:>2} threads: "
+                f"{operations / elapsed:>9,.0f} transfers/sec"
+            )
+
+
+def main():
+    run_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bank_account import CheckingAccount
+from bank_storage import BankStore
+
+ACCOUNTS = 50
+OPENING_BALANCE = 1000
+THREADS = 4
+
+
+def run_child(directory, crash_round):
+    # Runs in the process that gets killed: it sends transfers from several
+    # threads and prints each idempotency key once its transfer is on disk
+    store = BankStore(directory, snapshot_every=300)
+    bank = store.open("Crash Bank")
+    for number in range(len(bank.accounts), ACCOUNTS):
+        account = CheckingAccount("Holder", f"{number:010d}", OPENING_BALANCE)
+        bank.open_account(account)
+    print_lock = threading.Lock()
+
+    def teller(seed):
+        rng = random.Random(f"{crash_round}-{seed}")
+        for payment in range(1_000_000):
+            key = f"{crash_round}-{seed}-{payment}"
+            from_number = f"{rng.randrange(ACCOUNTS):010d}"
+            to_number = f"{rng.randrange(ACCOUNTS):010d}"
+            amount = rng.randint(1, 50000) / 100
+            if bank.transfer(from_number, to_number, amount, idempotency_key=key):
+                with print_lock:
+                    print(key, flush=True)
+
+    workers = [threading.Thread(target=teller, args=(seed,)) for seed in range(THREADS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def crash_once(directory, crash_round, rng):
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--child", directory, str(crash_round)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    acknowledged = []
+    reader = threading.Thread(
+        target=lambda: acknowledged.extend(line.strip() for line in child.stdout)
+    )
+    reader.start()
+    time.sleep(rng.uniform(0.3, 1.5))
+    child.send_signal(signal.SIGKILL)  # no chance to flush or close anything
+    child.wait()
+    reader.join()
+
+    torn = rng.random() < 0.5
+    if torn:
+        # Also leave half a record at the end, as if the disk stopped mid-write
+        last_segment = BankStore(directory).segments()[-1]
+        with open(os.path.join(directory, last_segment), "ab") as file:
+            file.write(b'1a2b3c4d [999999999,1700000000.0,"change",[["00000')
+    return acknowledged, torn
+
+
+def check_recovery(directory, acknowledged):
+    store = BankStore(directory)
+    bank = store.open("Crash Bank")
+    try:
+        total = sum(account.balance_cents for account in bank.accounts.values())
+        expected = len(bank.accounts) * OPENING_BALANCE * 100
+        assert total == expected, "money was created or lost"
+        for account in bank.accounts.values():
+            ledger = account.transactions
+            history = ledger.checkpoints[0] + sum(ledger.amounts)
+            assert account.balance_cents == history, (
+                f"{account.account_number}: balance does not match its history"
+            )
+        for key in acknowledged:
+            entry = bank.idempotency.entries.get(key)
+            assert entry is not None and entry.result is True, (
+                f"confirmed transfer {key} was lost"
+            )
+        return len(bank.accounts)
+    finally:
+        store.close()
+
+
+def main(rounds=10):
+    rng = random.Random()
+    with tempfile.TemporaryDirectory() as directory:
+        confirmed = 0
+        for crash_round in range(rounds):
+            acknowledged, torn = crash_once(directory, crash_round, rng)
+            accounts = check_recovery(directory, acknowledged)
+            confirmed += len(acknowledged)
+            note = ", torn last record" if torn else ""
+            print(
+                f"Crash {crash_round + 1}: {len(acknowledged)} confirmed transfers "
+                f"recovered across {accounts} accounts{note}"
+            )
+        print(f"All {confirmed} confirmed transfers survived {rounds} crashes")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        run_child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,111 @@
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+TRANSACTION_TYPES = ("Deposit", "Withdrawal")
+CHECKPOINT_EVERY = 1024  # entries between two saved running balances
+
+
+class Transaction:
+    def __init__(self, amount, transaction_type, description, timestamp=None):
+        self.amount = amount
+        self.transaction_type = transaction_type
+        self.description = description
+        self.timestamp = timestamp or datetime.now()
+
+    def __str__(self):
+        return f"{self.timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {self.transaction_type}: ${self.amount:.2f} - {self.description}"
+
+
+class DescriptionTable:
+    # Every account says "Deposit" or "Interest" millions of times, so each
+    # text is stored once and the ledgers only keep its number
+    def __init__(self):
+        self.ids = {}
+        self.texts = []
+        self.lock = threading.Lock()
+
+    def intern(self, text):
+        description_id = self.ids.get(text)
+        if description_id is None:
+            with self.lock:
+                description_id = self.ids.setdefault(text, len(self.texts))
+                if description_id == len(self.texts):
+                    self.texts.append(text)
+        return description_id
+
+
+DESCRIPTIONS = DescriptionTable()
+
+
+class Ledger:
+    """An account's transactions, stored column by column.
+
+    Instead of one Transaction object per entry, each field lives in its own
+    array: the amount in cents (negative for withdrawals), a type code, the
+    time in whole seconds since the epoch and a description number. That is 15
+    bytes per transaction. Transaction objects are only made when one is
+    looked at.
+
+    Every CHECKPOINT_EVERY entries the running balance is saved, and the
+    timestamps are kept in order, so the balance at any moment is found with a
+    bisect plus at most CHECKPOINT_EVERY - 1 additions, however long the
+    history is.
+    """
+
+    def __init__(self, opening_balance=0):
+        self.amounts = array("q")
+        self.types = array("B")
+        self.timestamps = array("I")
+        self.descriptions = array("H")  # widened to "I" past 65,535 descriptions
+        # checkpoints[k] is the balance before entry k * CHECKPOINT_EVERY
+        self.checkpoints = array("q", [opening_balance])
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def append(self, amount, transaction_type, description, timestamp=None):
+        self.amounts.append(amount)
+        self.types.append(TRANSACTION_TYPES.index(transaction_type))
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            timestamp = self.timestamps[-1]  # the clock went back; keep times sorted
+        self.timestamps.append(timestamp)
+        description_id = DESCRIPTIONS.intern(description)
+        if description_id > 0xFFFF and self.descriptions.typecode == "H":
+            self.descriptions = array("I", self.descriptions)
+        self.descriptions.append(description_id)
+        if len(self.amounts) % CHECKPOINT_EVERY == 0:
+            added = sum(self.amounts[-CHECKPOINT_EVERY:])
+            self.checkpoints.append(self.checkpoints[-1] + added)
+
+    def __getitem__(self, index):
+        return Transaction(
+            abs(self.amounts[index]) / 100,
+            TRANSACTION_TYPES[self.types[index]],
+            DESCRIPTIONS.texts[self.descriptions[index]],
+            datetime.fromtimestamp(self.timestamps[index]),
+        )
+
+    def __iter__(self):
+        # Views are made one at a time, so a long history is never all in memory
+        for index in range(len(self)):
+            yield self[index]
+
+    def count_before(self, timestamp):
+        # How many entries were made before timestamp (seconds since the epoch)
+        return bisect_left(self.timestamps, math.ceil(timestamp))
+
+    def balance_before(self, timestamp):
+        end = self.count_before(timestamp)
+        checkpoint = end // CHECKPOINT_EVERY
+        replay = self.amounts[checkpoint * CHECKPOINT_EVERY : end]
+        return self.checkpoints[checkpoint] + sum(replay)
+
+    def entries_between(self, start, end):
+        # Entries from start up to (not including) end; nothing else is read
+        for index in range(self.count_before(start), self.count_before(end)):
+            yield self[index]
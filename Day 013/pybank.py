@@ -0,0 +1,113 @@
+from datetime import date
+
+from bank_account import SavingsAccount
+from bank_storage import BankStore
+
+
+def main():
+    store = BankStore("bank_data")
+    bank = store.open("PyBank")
+
+    while True:
+        print("\nPyBank Account Simulator")
+        print("1. Create a new account")
+        print("2. Access existing account")
+        print("3. Apply month-end interest to all savings accounts")
+        print("4. Exit")
+
+        choice = input("Enter your choice (1-4): ")
+
+        if choice == "1":
+            account_holder = input("Enter account holder name: ")
+            account_type = input("Enter account type (savings/checking): ").lower()
+            initial_balance = float(input("Enter initial balance: "))
+
+            account = bank.create_account(account_type, account_holder, initial_balance)
+            if account:
+                print(
+                    f"Account created successfully. Your account number is: {account.account_number}"
+                )
+            else:
+                print("Invalid account type. Please try again.")
+
+        elif choice == "2":
+            account_number = input("Enter your account number: ")
+            account = bank.get_account(account_number)
+
+            if account:
+                while True:
+                    print(f"\nWelcome, {account.account_holder}")
+                    print("1. Check balance")
+                    print("2. Deposit")
+                    print("3. Withdraw")
+                    print("4. Print statement")
+                    print("5. Apply interest (Savings Account)")
+                    print("6. Print statement for a date range")
+                    print("7. Transfer to another account")
+                    print("8. Return to main menu")
+
+                    action = input("Enter your choice (1-8): ")
+
+                    if action == "1":
+                        print(f"Your current balance is: ${account.get_balance():.2f}")
+                    elif action == "2":
+                        amount = float(input("Enter deposit amount: "))
+                        if account.deposit(amount):
+                            print("Deposit successful")
+                        else:
+                            print("Invalid deposit amount")
+                    elif action == "3":
+                        amount = float(input("Enter withdrawal amount: "))
+                        if account.withdraw(amount):
+                            print("Withdrawal successful")
+                        else:
+                            print("Insufficient funds or invalid amount")
+                    elif action == "4":
+                        account.print_statement()
+                    elif action == "5":
+                        if isinstance(account, SavingsAccount):
+                            interest = account.apply_interest()
+                            print(f"Interest applied: ${interest:.2f}")
+                        else:
+                            print("This feature is only available for Savings Accounts")
+                    elif action == "6":
+                        try:
+                            start_date = date.fromisoformat(
+                                input("Enter the start date (YYYY-MM-DD): ")
+                            )
+                            end_date = date.fromisoformat(
+                                input("Enter the end date (YYYY-MM-DD): ")
+                            )
+                        except ValueError:
+                            print("Invalid date. Please use the YYYY-MM-DD format.")
+                        else:
+                            account.print_statement(start_date, end_date)
+                    elif action == "7":
+                        to_number = input("Enter the account number to pay: ")
+                        amount = float(input("Enter transfer amount: "))
+                        if bank.transfer(account.account_number, to_number, amount):
+                            print("Transfer successful")
+                        else:
+                            print("Transfer failed: check the account and amount")
+                    elif action == "8":
+                        break
+                    else:
+                        print("Invalid choice. Please try again.")
+            else:
+                print("Account not found. Please try again.")
+
+        elif choice == "3":
+            total = bank.apply_monthly_interest()
+            print(f"Interest paid to all savings accounts: ${total:.2f}")
+
+        elif choice == "4":
+            print("Thank you for using PyBank Account Simulator. Goodbye!")
+            store.close()
+            break
+
+        else:
+            print("Invalid choice. Please try again.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import sys
+from array import array
+
+MAX_HEALTH = 100
+FEEDING_HEALTH = 10
+DAILY_HEALTH_LOSS = 1
+DAYS_PER_YEAR = 365
+
+# DECAY[h] is what a health of h becomes after one day
+DECAY = bytes(max(health - DAILY_HEALTH_LOSS, 0) for health in range(256))
+
+
+def repeated(byte_value, count, width=1):
+    # A big integer whose every `width`-byte lane holds byte_value
+    lane = byte_value.to_bytes(width, "little")
+    return int.from_bytes(lane * count, "little")
+
+
+def add_capped(values, additions, cap):
+    # values[i] + additions[i], but no more than cap, for every byte at once.
+    # Both byte strings are read as one huge integer, one byte per animal, so
+    # a few integer operations do the work of a million-step loop. Values
+    # never pass cap and cap plus any addition stays under 128, so the top
+    # bit of each byte is free to mark the bytes that went over the cap.
+    count = len(values)
+    total = int.from_bytes(values, "little") + int.from_bytes(additions, "little")
+    over = (total + repeated(127 - cap, count)) & repeated(0x80, count)
+    over >>= 7
+    over = (over << 8) - over  # 0x01 becomes 0xFF in every byte that went over
+    capped = (total & ~over) | (repeated(cap, count) & over)
+    return bytearray(capped.to_bytes(count, "little"))
+
+
+class KindTable:
+    # Animals of the same species with the same diet share a kind, so each
+    # animal only stores a one-byte kind code. Every food gets one bit, and a
+    # kind's diet is the bits of the foods it eats.
+    def __init__(self):
+        self.codes = {}
+        self.species = []
+        self.diets = []
+        self.foods = {}
+        self.known = {}  # (species, tuple of foods) -> code, to skip the mask
+
+    def food_bit(self, food):
+        return self.foods.setdefault(food, 1 << len(self.foods))
+
+    def code(self, species, diet):
+        known = self.known.get((species, tuple(diet)))
+        if known is not None:
+            return known
+        diet_mask = 0
+        for food in diet:
+            diet_mask |= self.food_bit(food)
+        key = (species, diet_mask)
+        if key not in self.codes:
+            if len(self.species) == 256:
+                raise ValueError("A zoo can only hold 256 kinds of animal")
+            self.codes[key] = len(self.species)
+            self.species.append(species)
+            self.diets.append(diet_mask)
+        self.known[(species, tuple(diet))] = self.codes[key]
+        return self.codes[key]
+
+    def gains(self, food, amount):
+        # A translate table: the health gained by each kind from eating food
+        bit = self.foods.get(food, 0)
+        gains = bytearray(256)
+        for code, diet_mask in enumerate(self.diets):
+            if diet_mask & bit:
+                gains[code] = amount
+        return bytes(gains)
+
+
+KINDS = KindTable()
+
+
+class AnimalStore:
+    """Health, age and kind of many animals, stored column by column.
+
+    Each animal is one slot: a byte of health, its age in days and a byte
+    for its kind. The Animal objects are views that read and write their
+    own slot, so a whole feeding round or a day of ageing is a pass over
+    these columns instead of a loop over objects.
+    """
+
+    def __init__(self):
+        self.health = bytearray()
+        self.ages = array("I")  # in days; one tick is one day
+        self.kinds = bytearray()
+        self.animals = []  # the view for each slot
+
+    def __len__(self):
+        return len(self.animals)
+
+    def add(self, animal, health, age_days, kind):
+        self.health.append(health)
+        self.ages.append(age_days)
+        self.kinds.append(kind)
+        self.animals.append(animal)
+        return len(self.animals) - 1
+
+    def remove(self, slot):
+        # The last animal moves into the freed slot, so nothing has to shift
+        last = len(self.animals) - 1
+        if slot != last:
+            self.health[slot] = self.health[last]
+            self.ages[slot] = self.ages[last]
+            self.kinds[slot] = self.kinds[last]
+            moved = self.animals[last]
+            self.animals[slot] = moved
+            moved.slot = slot
+        self.health.pop()
+        self.ages.pop()
+        self.kinds.pop()
+        self.animals.pop()
+
+    def feed(self, food):
+        # Returns how much health each animal gained, 0 for animals that do not
+        # eat this food
+        return self.feed_with(KINDS.gains(food, FEEDING_HEALTH))
+
+    def feed_with(self, gains_by_kind):
+        # gains_by_kind is a table from KindTable.gains, which can be made once
+        # and reused, even in another process
+        gains = self.kinds.translate(gains_by_kind)
+        self.health = add_capped(self.health, gains, MAX_HEALTH)
+        return gains
+
+    def tick(self):
+        # One day passes: every animal gets a day older and loses some health
+        self.health = self.health.translate(DECAY)
+        count = len(self.ages)
+        if count:
+            ages = int.from_bytes(self.ages, sys.byteorder) + repeated(1, count, 4)
+            self.ages = array("I")
+            self.ages.frombytes(ages.to_bytes(count * 4, sys.byteorder))
@@ -0,0 +1,78 @@
+import os
+import random
+import time
+
+from zoo_events import QUIET
+from zoo_management import Lion, Parrot, Snake, Zoo
+from zoo_simulation import EnclosureSimulation
+
+
+def build_enclosures(count, animals_per_enclosure, seed=0):
+    rng = random.Random(seed)
+    zoos = []
+    for number in range(count):
+        zoo = Zoo(f"Enclosure {number}", events=QUIET)
+        for index in range(animals_per_enclosure):
+            kind = rng.randrange(3)
+            age = rng.randint(0, 20)
+            if kind == 0:
+                animal = Lion(f"Lion {index}", age)
+            elif kind == 1:
+                animal = Parrot(f"Parrot {index}", age)
+            else:
+                animal = Snake(f"Snake {index}", age, rng.random() < 0.5)
+            animal.health = rng.randint(40, 100)
+            zoo.add_animal(animal)
+        zoos.append(zoo)
+    return zoos
+
+
+def run_benchmark(enclosures=10_000, animals_per_enclosure=20, days=365):
+    cores = os.cpu_count()
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= cores:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != cores:
+        worker_counts.append(cores)
+
+    zoos = build_enclosures(enclosures, animals_per_enclosure)
+    starting = [(zoo.store.health[:], zoo.store.ages[:]) for zoo in zoos]
+    animals = enclosures * animals_per_enclosure
+    print(
+        f"\n{enclosures:,} enclosures, {animals:,} animals, {days} days, "
+        f"{cores} cores"
+    )
+
+    baseline = None
+    expected = None
+    for workers in worker_counts:
+        for zoo, (health, ages) in zip(zoos, starting):
+            zoo.store.health, zoo.store.ages = health[:], ages[:]
+        simulation = EnclosureSimulation(zoos)
+        start = time.perf_counter()
+        summaries = simulation.run(days, workers)
+        elapsed = time.perf_counter() - start
+
+        # However the work is split, the results must be the same
+        expected = expected or summaries
+        assert summaries == expected, "results depend on the number of workers"
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        print(
+            f"{workers:>3} workers: {elapsed:6.2f}s, {speedup:5.2f}x faster, "
+            f"{speedup / workers:4.0%} efficiency"
+        )
+
+    last = summaries[-1]
+    print(
+        f"Day {last.day}: average health {last.average_health:.1f}, "
+        f"lowest {last.lowest_health}, {last.weak:,} weak animals"
+    )
+
+
+def main():
+    run_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import random
+import time
+
+from zoo_events import QUIET
+from zoo_management import Lion, Parrot, Snake, Zoo
+
+
+def build_zoo(count, seed=0):
+    rng = random.Random(seed)
+    zoo = Zoo("Benchmark Zoo", events=QUIET)
+    for number in range(count):
+        kind = rng.randrange(3)
+        age = rng.randint(0, 20)
+        if kind == 0:
+            animal = Lion(f"Lion {number}", age)
+        elif kind == 1:
+            animal = Parrot(f"Parrot {number}", age)
+        else:
+            animal = Snake(f"Snake {number}", age, rng.random() < 0.5)
+        animal.health = rng.randint(0, 100)
+        zoo.add_animal(animal)
+    return zoo
+
+
+def best_time(action, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(count=1_000_000):
+    start = time.perf_counter()
+    zoo = build_zoo(count)
+    print(f"\nBuilt a zoo of {count:,} animals in {time.perf_counter() - start:.1f}s")
+
+    # Check the fast passes against the animals, one at a time
+    sample = random.Random(1).sample(zoo.animals, 1000)
+    before = [(animal.health, zoo.store.ages[animal.slot]) for animal in sample]
+    zoo.feed_animals("meat")
+    zoo.tick()
+    for animal, (health, age_days) in zip(sample, before):
+        if "meat" in animal.diet:
+            health = min(health + 10, 100)
+        assert animal.health == max(health - 1, 0)
+        assert zoo.store.ages[animal.slot] == age_days + 1
+
+    feeding = best_time(lambda: zoo.feed_animals("seeds"))
+    ticking = best_time(zoo.tick)
+    print(f"Feeding every animal: {feeding * 1000:6.1f} ms")
+    print(f"One tick (a day):     {ticking * 1000:6.1f} ms")
+
+
+def main():
+    run_benchmark()
+
+
+if __name__ == "__main__":
+    main()
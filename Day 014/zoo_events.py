@@ -0,0 +1,142 @@
+import json
+import sys
+from collections import namedtuple
+from json.encoder import encode_basestring_ascii
+
+# One type per thing that can happen, each with the fields it reports
+Added = namedtuple("Added", "name species zoo")
+AlreadyInZoo = namedtuple("AlreadyInZoo", "name species zoo")
+Removed = namedtuple("Removed", "name species zoo")
+NotInZoo = namedtuple("NotInZoo", "name species zoo")
+Ate = namedtuple("Ate", "name species food")
+Refused = namedtuple("Refused", "name species food")
+HealthChecked = namedtuple("HealthChecked", "name species health")
+Groomed = namedtuple("Groomed", "name species fur_color")
+Flew = namedtuple("Flew", "name species wingspan")
+Basked = namedtuple("Basked", "name species")
+Mimicked = namedtuple("Mimicked", "name species sound")
+Spoke = namedtuple("Spoke", "name species sound")
+
+MESSAGES = {
+    Added: "{name} the {species} has been added to {zoo}",
+    AlreadyInZoo: "{name} the {species} is already in {zoo}",
+    Removed: "{name} the {species} has been removed from {zoo}",
+    NotInZoo: "{name} the {species} is not in {zoo}",
+    Ate: "{name} the {species} is eating {food}",
+    Refused: "{name} the {species} doesn't eat {food}",
+    HealthChecked: "{name} the {species} has {health} health",
+    Groomed: "{name} the {species} is grooming its {fur_color} fur",
+    Flew: "{name} the {species} is flying with a wingspan of {wingspan} inches",
+    Basked: "{name} the {species} is basking in the sun",
+    Mimicked: "{name} the {species} is mimicking {sound}",
+    Spoke: "{name} the {species} says {sound}",
+}
+
+
+def by_position(event_type, message):
+    # "{name} the {species}" becomes "{0} the {1}", which formats from the
+    # tuple itself, about three times faster than by field name
+    for position, field in enumerate(event_type._fields):
+        message = message.replace("{" + field + "}", "{" + str(position) + "}")
+    return message
+
+
+TEMPLATES = {
+    event_type: by_position(event_type, message)
+    for event_type, message in MESSAGES.items()
+}
+
+
+def describe(event):
+    return TEMPLATES[type(event)].format(*event)
+
+
+def print_events(events):
+    # One write for the whole batch instead of one print per event
+    sys.stdout.write("".join(describe(event) + "\n" for event in events))
+
+
+def json_value(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)  # what json.dumps does, minus the setup
+    return json.dumps(value)
+
+
+def json_template(event_type):
+    # '{"event": "Ate", "name": %s, "species": %s, "food": %s}\n'
+    fields = "".join(f', "{field}": %s' for field in event_type._fields)
+    return '{"event": "' + event_type.__name__ + '"' + fields + "}\n"
+
+
+class JsonLinesWriter:
+    # Writes each event as one JSON object per line, e.g.
+    # {"event": "Ate", "name": "Leo", "species": "Lion", "food": "meat"}
+    def __init__(self, file):
+        self.file = file
+        self.templates = {
+            event_type: json_template(event_type) for event_type in MESSAGES
+        }
+
+    def __call__(self, events):
+        templates = self.templates
+        lines = (
+            templates[type(event)] % tuple(map(json_value, event)) for event in events
+        )
+        self.file.write("".join(lines))
+
+
+class EventSink:
+    """Collects events in a ring buffer and hands them on in batches.
+
+    writer is called with a list of events: print_events, a JsonLinesWriter
+    or any function of your own. The buffer is flushed to it when it is full
+    and whenever flush() is called. Without a writer nothing is written and
+    the buffer just keeps the last `capacity` events, oldest first in recent().
+    """
+
+    enabled = True
+
+    def __init__(self, writer=None, capacity=1024):
+        self.writer = writer
+        self.capacity = capacity
+        self.buffer = [None] * capacity
+        self.start = 0  # where the oldest event is
+        self.count = 0
+
+    def emit(self, event):
+        self.buffer[(self.start + self.count) % self.capacity] = event
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.capacity  # the oldest is gone
+        if self.count == self.capacity and self.writer is not None:
+            self.flush()
+
+    def recent(self):
+        end = self.start + self.count
+        if end <= self.capacity:
+            return self.buffer[self.start : end]
+        return self.buffer[self.start :] + self.buffer[: end - self.capacity]
+
+    def flush(self):
+        if self.count and self.writer is not None:
+            events = self.recent()
+            self.start = self.count = 0
+            self.writer(events)
+
+
+class NullSink:
+    # Throws every event away. Code that would build many events checks
+    # `enabled` first, so a quiet simulation does not even make them.
+    enabled = False
+
+    def emit(self, event):
+        pass
+
+    def flush(self):
+        pass
+
+
+# Lone animals report at once, as print did
+PRINT_NOW = EventSink(print_events, capacity=1)
+QUIET = NullSink()
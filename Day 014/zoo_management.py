@@ -1,13 +1,88 @@
 from abc import ABC, abstractmethod
 
+from animal_store import AnimalStore, DAYS_PER_YEAR, FEEDING_HEALTH, KINDS, MAX_HEALTH
+from zoo_events import (
+    PRINT_NOW,
+    Added,
+    AlreadyInZoo,
+    Ate,
+    Basked,
+    EventSink,
+    Flew,
+    Groomed,
+    HealthChecked,
+    Mimicked,
+    NotInZoo,
+    Refused,
+    Removed,
+    Spoke,
+    print_events,
+)
+
 
 class Animal(ABC):
     def __init__(self, name, age, species, diet):
         self.name = name
-        self.age = age
         self.species = species
         self.diet = diet
-        self.health = 100
+        self.animal_id = None  # given by the zoo the animal joins
+        self.zoo = None  # the zoo the animal is in, if any
+        self.events = PRINT_NOW  # where what the animal does is reported
+        # Health and age live in slot `slot` of an AnimalStore. A Zoo adds a
+        # new animal straight into its own store. Until then, or after it
+        # leaves, the animal holds its health, age in days and kind itself.
+        self.store = None
+        self.slot = None
+        kind = KINDS.code(species, diet)
+        self.values = [MAX_HEALTH, age * DAYS_PER_YEAR, kind]
+
+    @property
+    def health(self):
+        if self.store is None:
+            return self.values[0]
+        return self.store.health[self.slot]
+
+    @health.setter
+    def health(self, health):
+        health = max(0, min(health, MAX_HEALTH))
+        if self.store is None:
+            self.values[0] = health
+        else:
+            self.store.health[self.slot] = health
+
+    @property
+    def age(self):
+        if self.store is None:
+            return self.values[1] // DAYS_PER_YEAR
+        return self.store.ages[self.slot] // DAYS_PER_YEAR
+
+    @age.setter
+    def age(self, age):
+        if self.store is None:
+            self.values[1] = age * DAYS_PER_YEAR
+        else:
+            self.store.ages[self.slot] = age * DAYS_PER_YEAR
+
+    def move_to(self, store):
+        old_store, old_slot = self.store, self.slot
+        if old_store is None:
+            self.slot = store.add(self, *self.values)
+            self.values = None
+        else:
+            self.slot = store.add(
+                self,
+                old_store.health[old_slot],
+                old_store.ages[old_slot],
+                old_store.kinds[old_slot],
+            )
+            old_store.remove(old_slot)
+        self.store = store
+
+    def leave_store(self):
+        store, slot = self.store, self.slot
+        self.values = [store.health[slot], store.ages[slot], store.kinds[slot]]
+        self.store = self.slot = None
+        store.remove(slot)
 
     @abstractmethod
     def make_sound(self):
@@ -15,15 +90,13 @@ class Animal(ABC):
 
     def eat(self, food):
         if food in self.diet:
-            print(f"{self.name} the {self.species} is eating {food}")
-            self.health += 10
-            if self.health > 100:
-                self.health = 100
+            self.events.emit(Ate(self.name, self.species, food))
+            self.health += FEEDING_HEALTH
         else:
-            print(f"{self.name} the {self.species} doesn't eat {food}")
+            self.events.emit(Refused(self.name, self.species, food))
 
     def check_health(self):
-        print(f"{self.name} the {self.species} has {self.health} health")
+        self.events.emit(HealthChecked(self.name, self.species, self.health))
 
 
 class Mammal(Animal):
@@ -32,10 +105,8 @@ class Mammal(Animal):
         self.fur_color = fur_color
 
     def groom(self):
-        print(f"{self.name} the {self.species} is grooming its {self.fur_color} fur")
+        self.events.emit(Groomed(self.name, self.species, self.fur_color))
         self.health += 5
-        if self.health > 100:
-            self.health = 100
 
 
 class Bird(Animal):
@@ -44,24 +115,18 @@ class Bird(Animal):
         self.wingspan = wingspan
 
     def fly(self):
-        print(
-            f"{self.name} the {self.species} is flying with a wingspan of {self.wingspan} inches"
-        )
+        self.events.emit(Flew(self.name, self.species, self.wingspan))
         self.health += 5
-        if self.health < 0:
-            self.health = 0
 
 
 class Reptile(Animal):
-    def __init__(self, name, age, species, diet, length):
+    def __init__(self, name, age, species, diet, is_venomous):
         super().__init__(name, age, species, diet)
-        self.is_venoumos = is_venoumos
+        self.is_venomous = is_venomous
 
     def bask(self):
-        print(f"{self.name} the {self.species} is basking in the sun")
+        self.events.emit(Basked(self.name, self.species))
         self.health += 5
-        if self.health > 100:
-            self.health = 100
 
 
 class Lion(Mammal):
@@ -69,7 +134,7 @@ class Lion(Mammal):
         super().__init__(name, age, "Lion", ["meat"], "golden")
 
     def make_sound(self):
-        print("Roar!")
+        return "Roar!"
 
 
 class Parrot(Bird):
@@ -80,7 +145,7 @@ class Parrot(Bird):
         return "Squawk!"
 
     def mimic(self, sound):
-        print(f"{self.name} the Parrot is mimicking {sound}")
+        self.events.emit(Mimicked(self.name, self.species, sound))
 
 
 class Snake(Reptile):
@@ -92,40 +157,124 @@ class Snake(Reptile):
 
 
 class Zoo:
-    def __init__(self, name):
+    def __init__(self, name, events=None):
         self.name = name
-        self.animals = []
+        # Reports are collected and printed in batches unless another sink,
+        # such as QUIET for a simulation, is given
+        self.events = EventSink(print_events) if events is None else events
+        self.store = AnimalStore()
+        self.animals = self.store.animals  # in slot order
+        self.next_id = 1
+        self.animals_by_id = {}  # animal ID -> animal
+        self.ids_by_name = {}  # name -> set of animal IDs
+        self.ids_by_species = {}  # species -> set of animal IDs
+
+    def index_animal(self, animal):
+        self.animals_by_id[animal.animal_id] = animal
+        self.ids_by_name.setdefault(animal.name, set()).add(animal.animal_id)
+        self.ids_by_species.setdefault(animal.species, set()).add(animal.animal_id)
+
+    def unindex_animal(self, animal):
+        del self.animals_by_id[animal.animal_id]
+        for index, key in (
+            (self.ids_by_name, animal.name),
+            (self.ids_by_species, animal.species),
+        ):
+            index[key].discard(animal.animal_id)
+            if not index[key]:
+                del index[key]
 
     def add_animal(self, animal):
-        self.animals.append(animal)
-        print(f"{animal.name} the {animal.species} has been added to {self.name}")
+        if animal.zoo is self:
+            self.events.emit(AlreadyInZoo(animal.name, animal.species, self.name))
+            return
+        if animal.zoo is not None:
+            # Moving between zoos: the old zoo takes it out of its indexes
+            # before its store slot is given up
+            animal.zoo.remove_animal(animal)
+        animal.move_to(self.store)
+        animal.zoo = self
+        animal.animal_id = self.next_id
+        animal.events = self.events
+        self.next_id += 1
+        self.index_animal(animal)
+        if self.events.enabled:
+            self.events.emit(Added(animal.name, animal.species, self.name))
 
     def remove_animal(self, animal):
-        if animal in self.animals:
-            self.animals.remove(animal)
-            print(
-                f"{animal.name} the {animal.species} has been removed from {self.name}"
-            )
+        if animal.zoo is self:
+            # The store fills the freed slot with its last animal, and the
+            # indexes are dictionaries, so nothing else has to move
+            self.unindex_animal(animal)
+            animal.leave_store()
+            animal.animal_id = None
+            animal.zoo = None
+            animal.events = PRINT_NOW
+            self.events.emit(Removed(animal.name, animal.species, self.name))
         else:
-            print(f"{animal.name} the {animal.species} is not in {self.name}")
+            self.events.emit(NotInZoo(animal.name, animal.species, self.name))
 
     def feed_animals(self, food):
-        for animal in self.animals:
+        # Every animal eats in one pass over the store; the events are only
+        # made afterwards, and not at all when nobody is listening
+        gains = self.store.feed(food)
+        if self.events.enabled:
+            emit = self.events.emit
+            for animal, gain in zip(self.animals, gains):
+                event = Ate if gain else Refused
+                emit(event(animal.name, animal.species, food))
+
+    def feed_species(self, species, food):
+        # Only the animals of this species are visited
+        for animal in self.animals_of(species):
             animal.eat(food)
 
+    def animals_of(self, species):
+        ids = self.ids_by_species.get(species, ())
+        return [self.animals_by_id[animal_id] for animal_id in ids]
+
+    def find_animals(self, name):
+        # Several animals can share a name; they are told apart by their IDs
+        ids = sorted(self.ids_by_name.get(name, ()))
+        return [self.animals_by_id[animal_id] for animal_id in ids]
+
+    def find_animal(self, animal_id):
+        return self.animals_by_id.get(animal_id)
+
+    def tick(self):
+        # One day passes for every animal at once
+        self.store.tick()
+
     def zoo_sounds(self):
         for animal in self.animals:
-            print(f"{animal.name} the {animal.species} says {animal.make_sound()}")
+            self.events.emit(Spoke(animal.name, animal.species, animal.make_sound()))
 
     def check_health(self):
         for animal in self.animals:
             animal.check_health()
 
 
+def choose_animal(zoo, name):
+    # Asks which one is meant when several animals have this name
+    animals = zoo.find_animals(name)
+    if len(animals) <= 1:
+        return animals[0] if animals else None
+    for animal in animals:
+        print(
+            f"ID {animal.animal_id}: {animal.name} the {animal.species}, "
+            f"{animal.age} years old"
+        )
+    try:
+        return zoo.find_animal(int(input("Enter the ID of the animal: ")))
+    except ValueError:
+        return None
+
+
 def main():
     zoo = Zoo("PyZoo")
 
     while True:
+        zoo.events.flush()  # show what happened before asking again
         print("\nPyZoo Management System")
         print("1. Add an animal")
         print("2. Remove an animal")
@@ -133,7 +282,8 @@ def main():
         print("4. Listen to zoo sounds")
         print("5. Check animals' health")
         print("6. Perform special action")
-        print("7. Exit")
+        print("7. Let a day pass")
+        print("8. Exit")
         print()
 
         choice = input("Enter your choice: ")
@@ -164,9 +314,7 @@ def main():
 
         elif choice == "2":
             name = input("Enter the name of the animal to remove: ")
-            animal_to_remove = next(
-                (animal for animal in zoo.animals if animal.name == name), None
-            )
+            animal_to_remove = choose_animal(zoo, name)
             if animal_to_remove:
                 zoo.remove_animal(animal_to_remove)
             else:
@@ -174,7 +322,11 @@ def main():
 
         elif choice == "3":
             food = input("Enter the food to feed the animals: ")
-            zoo.feed_animals(food)
+            species = input("Enter the species to feed (leave blank for all): ")
+            if species:
+                zoo.feed_species(species.title(), food)
+            else:
+                zoo.feed_animals(food)
 
         elif choice == "4":
             zoo.zoo_sounds()
@@ -184,9 +336,7 @@ def main():
 
         elif choice == "6":
             name = input("Enter the name of the animal to perform the special action: ")
-            animal = next(
-                (animal for animal in zoo.animals if animal.name == name), None
-            )
+            animal = choose_animal(zoo, name)
             if animal:
                 if isinstance(animal, Mammal):
                     animal.groom()
@@ -195,12 +345,17 @@ def main():
                 elif isinstance(animal, Reptile):
                     animal.bask()
                 if isinstance(animal, Parrot):
+                    zoo.events.flush()
                     sound = input("Enter a sound for the parrot to mimic: ")
                     animal.mimic(sound)
             else:
                 print(f"{name} is not in the zoo")
 
         elif choice == "7":
+            zoo.tick()
+            print("A day has passed. Every animal is a day older and a little hungrier")
+
+        elif choice == "8":
             print("Exiting PyZoo Management System")
             break
 
@@ -0,0 +1,137 @@
+import os
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from animal_store import FEEDING_HEALTH, KINDS, MAX_HEALTH, AnimalStore
+
+WEAK_HEALTH = 20  # animals below this count as weak in the daily summary
+NOT_WEAK = bytes(range(WEAK_HEALTH))  # deleted by translate to count the rest
+
+# What is fed on each day of the week; the plan repeats
+WEEKLY_FEEDING = [
+    ["meat", "seeds"],
+    ["rodents", "fruit"],
+    [],
+    ["meat", "seeds", "rodents"],
+    ["fruit"],
+    ["meat", "rodents"],
+    [],
+]
+
+DailySummary = namedtuple(
+    "DailySummary", "day animals average_health lowest_health weak"
+)
+
+
+def pack(zoos):
+    # A shard of enclosures travels to a worker as four byte strings: the
+    # health, ages and kinds of all its animals back to back, plus how many
+    # animals each enclosure has. Pickling bytes is a copy; pickling the zoos
+    # would mean walking every Animal object.
+    health, ages, kinds = bytearray(), array("I"), bytearray()
+    sizes = array("I")
+    for zoo in zoos:
+        health += zoo.store.health
+        ages += zoo.store.ages
+        kinds += zoo.store.kinds
+        sizes.append(len(zoo.store.health))
+    return bytes(health), ages.tobytes(), bytes(kinds), sizes.tobytes()
+
+
+def unpack(zoos, health, ages, sizes):
+    # Puts the simulated columns back into each enclosure's store
+    all_ages = array("I")
+    all_ages.frombytes(ages)
+    start = 0
+    for zoo, size in zip(zoos, array("I", sizes)):
+        zoo.store.health = bytearray(health[start : start + size])
+        zoo.store.ages = all_ages[start : start + size]
+        start += size
+
+
+def simulate_shard(health, ages, kinds, daily_gains, days):
+    # Runs in a worker process. The enclosures do not affect each other, so the
+    # whole shard is simulated as one long store.
+    store = AnimalStore()
+    store.health = bytearray(health)
+    store.ages.frombytes(ages)
+    store.kinds = bytearray(kinds)
+    health_sums = array("Q")
+    lowest = bytearray()
+    weak = array("I")
+    for day in range(days):
+        for gains_by_kind in daily_gains[day % len(daily_gains)]:
+            store.feed_with(gains_by_kind)
+        store.tick()
+        health = store.health
+        health_sums.append(sum(health))
+        lowest.append(min(health, default=MAX_HEALTH))
+        weak.append(len(health) - len(health.translate(None, NOT_WEAK)))
+    return bytes(store.health), store.ages.tobytes(), health_sums, lowest, weak
+
+
+def split(items, count):
+    # count runs of nearly equal length, in order
+    size, extra = divmod(len(items), count)
+    start = 0
+    for index in range(count):
+        end = start + size + (index < extra)
+        yield items[start:end]
+        start = end
+
+
+class EnclosureSimulation:
+    """Simulates many independent enclosures, each its own Zoo, in parallel.
+
+    The enclosures are split into shards that run in a process pool. Each
+    shard is shipped as packed columns, simulated day by day (feeding from
+    the plan, then a tick) and sent back with its daily totals, which are
+    merged into one DailySummary per day. The final health and ages are
+    written back into the zoos.
+    """
+
+    def __init__(self, zoos, feeding_plan=WEEKLY_FEEDING):
+        self.zoos = zoos
+        # The kind table lives in this process, so the workers get ready-made
+        # gain tables instead of food names
+        self.daily_gains = [
+            [KINDS.gains(food, FEEDING_HEALTH) for food in foods]
+            for foods in feeding_plan
+        ]
+
+    def run(self, days, workers=None, shards_per_worker=4):
+        workers = workers or os.cpu_count()
+        shard_count = max(1, min(len(self.zoos), workers * shards_per_worker))
+        shards = list(split(self.zoos, shard_count))
+        packed = [pack(shard) for shard in shards]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(
+                pool.map(
+                    simulate_shard,
+                    [health for health, _, _, _ in packed],
+                    [ages for _, ages, _, _ in packed],
+                    [kinds for _, _, kinds, _ in packed],
+                    repeat(self.daily_gains),
+                    repeat(days),
+                )
+            )
+
+        animals = sum(len(health) for health, _, _, _ in packed)
+        summaries = []
+        for day in range(days):
+            health_sum = sum(result[2][day] for result in results)
+            summaries.append(
+                DailySummary(
+                    day + 1,
+                    animals,
+                    health_sum / animals if animals else 0,
+                    min(result[3][day] for result in results),
+                    sum(result[4][day] for result in results),
+                )
+            )
+        for shard, (_, _, _, sizes), result in zip(shards, packed, results):
+            unpack(shard, result[0], result[1], sizes)
+        return summaries
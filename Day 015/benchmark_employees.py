@@ -0,0 +1,130 @@
+import contextlib
+import os
+import random
+import time
+import tracemalloc
+from heapq import nlargest
+
+from ems import Developer, EmployeeManagementSystem, Manager, SalesRepresentative
+
+
+class DictDeveloper:
+    # The same fields kept in an ordinary instance dictionary, as the
+    # employee classes did before they had __slots__
+    def __init__(self, emp_id, name, email, base_salary, overtime_hours):
+        self._emp_id = emp_id
+        self._name = name
+        self._email = email
+        self._base_salary = base_salary
+        self._salary = 0
+        self._salary_dirty = True
+        self._watcher = None
+        self._overtime_hours = overtime_hours
+
+
+def make_employees(count, seed=0):
+    rng = random.Random(seed)
+    employees = []
+    for number in range(count):
+        emp_id = f"E{number:07d}"
+        name = f"Employee {number}"
+        email = f"employee{number}@example.com"
+        base_salary = rng.randint(3000, 15000)
+        kind = rng.randrange(3)
+        if kind == 0:
+            employee = Manager(emp_id, name, email, base_salary, rng.randint(0, 30))
+        elif kind == 1:
+            overtime = rng.randint(0, 40)
+            employee = Developer(emp_id, name, email, base_salary, overtime)
+        else:
+            commission = rng.randint(0, 15)
+            sales = rng.randint(0, 100000)
+            employee = SalesRepresentative(
+                emp_id, name, email, base_salary, commission, sales
+            )
+        employees.append(employee)
+    return employees
+
+
+def bytes_per_object(make, count=100_000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make(number) for number in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(objects)
+
+
+def measure_memory():
+    def record(number):
+        return (f"E{number:07d}", f"Employee {number}", f"e{number}@example.com")
+
+    shared = record(0)
+    print("\nMemory per developer")
+    for label, make_record in (
+        ("the object alone", lambda number: shared),
+        ("with its own strings", record),
+    ):
+        slotted = bytes_per_object(
+            lambda number: Developer(*make_record(number), 5000, 10)
+        )
+        with_dict = bytes_per_object(
+            lambda number: DictDeveloper(*make_record(number), 5000, 10)
+        )
+        print(
+            f"{label:>20}: {with_dict:4.0f} bytes with a dictionary, "
+            f"{slotted:4.0f} with __slots__"
+        )
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def measure_queries(count=1_000_000):
+    employees = make_employees(count)
+    ems = EmployeeManagementSystem()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for employee in employees:
+            ems.add_employee(employee)
+    print(f"\nQueries over {count:,} employees")
+
+    _, building = timed(lambda: ems.top_earners(10))
+    print(f"first query, filing everyone:    {building:8.1f} ms")
+
+    top, indexed = timed(lambda: ems.top_earners(10))
+    expected, scanning = timed(
+        lambda: nlargest(10, employees, key=lambda employee: employee.salary)
+    )
+    assert [e.salary for e in top] == [e.salary for e in expected]
+    print(f"top 10 earners, indexed:         {indexed:8.1f} ms")
+    print(f"top 10 earners, full scan:       {scanning:8.1f} ms")
+
+    found, indexed = timed(lambda: ems.developers_with_overtime_over(38))
+    expected, scanning = timed(
+        lambda: [
+            employee
+            for employee in employees
+            if isinstance(employee, Developer) and employee.overtime_hours > 38
+        ]
+    )
+    assert {e.emp_id for e in found} == {e.emp_id for e in expected}
+    print(f"developers with overtime > 38:   {indexed:8.1f} ms indexed")
+    print(f"                                 {scanning:8.1f} ms full scan")
+
+    # A few changes only refile the employees that changed
+    developer = ems.developers_with_overtime_over(0)[0]
+    developer.overtime_hours = 40
+    _, refiling = timed(lambda: ems.developers_with_overtime_over(38))
+    print(f"same query after one change:     {refiling:8.1f} ms")
+
+
+def main():
+    measure_memory()
+    measure_queries()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import random
+import time
+
+from ems import Developer, Manager, SalesRepresentative
+from payroll import PayrollEngine
+
+
+def build_engine(count, seed=0):
+    # Fills the columns directly, as a payroll import would
+    rng = random.Random(seed)
+    engine = PayrollEngine()
+    for number in range(count):
+        emp_id = f"E{number:07d}"
+        base_salary = rng.randint(3000_00, 15000_00) / 100
+        kind = rng.randrange(3)
+        if kind == 0:
+            engine.managers.add(emp_id, base_salary, rng.randint(0, 3000) / 100)
+        elif kind == 1:
+            engine.developers.add(emp_id, base_salary, rng.randint(0, 4000) / 100)
+        else:
+            engine.sales.add(
+                emp_id,
+                base_salary,
+                rng.randint(0, 1500) / 100,
+                rng.randint(0, 100000_00) / 100,
+            )
+    return engine
+
+
+def check_against_objects(register, engine, sample=1000):
+    # The columns must give the same salaries as calculate_salary, to the cent
+    checked = 0
+    for columns in (engine.managers, engine.developers, engine.sales):
+        for index in range(min(sample, len(columns.ids))):
+            base = columns.base[index] / 100
+            if columns is engine.managers:
+                employee = Manager("x", "x", "x@x", base, columns.bonus[index] / 100)
+            elif columns is engine.developers:
+                overtime = columns.overtime[index] / 100
+                employee = Developer("x", "x", "x@x", base, overtime)
+            else:
+                commission = columns.commission[index] / 100
+                sales = columns.sales[index] / 100
+                employee = SalesRepresentative(
+                    "x", "x", "x@x", base, commission, sales
+                )
+            expected = round(employee.salary * 100)
+            salaries = next(
+                salaries
+                for role, _, salaries in register.groups
+                if role == columns.role
+            )
+            assert abs(salaries[index] - expected) <= 1, (columns.role, index)
+            checked += 1
+    return checked
+
+
+def run_benchmark(count=1_000_000):
+    start = time.perf_counter()
+    engine = build_engine(count)
+    print(f"\nLoaded {count:,} employees in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    register = engine.run()
+    elapsed = time.perf_counter() - start
+    total = register.total_cents() / 100
+    print(f"Payroll run: {elapsed * 1000:.0f} ms, total ${total:,.2f}")
+    checked = check_against_objects(register, engine)
+    print(f"Checked {checked} salaries against calculate_salary")
+
+
+def main():
+    run_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,39 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from heapq import nlargest
+
+from payroll import PayrollEngine
+
+SALARY_BAND = 1000  # width of the salary bands employees are filed under
 
 
 class Employee(ABC):
+    # Fixed slots instead of a dictionary in every instance save memory when
+    # there are many employees; each subclass adds slots for its own inputs
+    __slots__ = (
+        "_emp_id",
+        "_name",
+        "_email",
+        "_base_salary",
+        "_salary",
+        "_salary_dirty",
+        "_watcher",
+    )
+
     def __init__(self, emp_id, name, email):
         self._emp_id = emp_id
         self._name = name
         self._email = email
+        self._base_salary = 0
         self._salary = 0
+        # The salary is only worked out again after one of its inputs changes
+        self._salary_dirty = True
+        self._watcher = None  # the system holding the employee, told of changes
+
+    def _inputs_changed(self):
+        self._salary_dirty = True
+        if self._watcher is not None:
+            self._watcher.employee_changed(self)
 
     @property
     def emp_id(self):
@@ -34,14 +61,33 @@ class Employee(ABC):
         else:
             raise ValueError("Invalid email format")
 
+    @property
+    def base_salary(self):
+        return self._base_salary
+
+    @base_salary.setter
+    def base_salary(self, value):
+        if isinstance(value, (int, float)) and value >= 0:
+            self._base_salary = value
+            self._inputs_changed()
+        else:
+            raise ValueError("Base salary must be a non-negative number")
+
     @property
     def salary(self):
+        if self._salary_dirty:
+            self.calculate_salary()
+            self._salary_dirty = False
         return self._salary
 
     @salary.setter
     def salary(self, value):
+        # A salary set by hand stays until one of its inputs changes
         if isinstance(value, (int, float)) and value >= 0:
             self._salary = value
+            self._salary_dirty = False
+            if self._watcher is not None:
+                self._watcher.employee_changed(self)
         else:
             raise ValueError("Salary must be a non-negative number")
 
@@ -50,10 +96,13 @@ class Employee(ABC):
         pass
 
     def __str__(self):
-        return f"ID: {self._emp_id}, Name: {self._name}, Email: {self._email}, Salary: ${self._salary:.2f}"
+        return f"ID: {self._emp_id}, Name: {self._name}, Email: {self._email}, Salary: ${self.salary:.2f}"
 
 
 class Manager(Employee):
+    role = "Manager"
+    __slots__ = ("_bonus_percentage",)
+
     def __init__(self, emp_id, name, email, base_salary, bonus_percentage):
         super().__init__(emp_id, name, email)
         self._base_salary = base_salary
@@ -67,6 +116,7 @@ class Manager(Employee):
     def bonus_percentage(self, value):
         if 0 <= value <= 100:
             self._bonus_percentage = value
+            self._inputs_changed()
         else:
             raise ValueError("Bonus percentage must be between 0 and 100")
 
@@ -76,6 +126,9 @@ class Manager(Employee):
 
 
 class Developer(Employee):
+    role = "Developer"
+    __slots__ = ("_overtime_hours",)
+
     def __init__(self, emp_id, name, email, base_salary, overtime_hours):
         super().__init__(emp_id, name, email)
         self._base_salary = base_salary
@@ -89,6 +142,7 @@ class Developer(Employee):
     def overtime_hours(self, value):
         if value >= 0:
             self._overtime_hours = value
+            self._inputs_changed()
         else:
             raise ValueError("Overtime hours must be non-negative")
 
@@ -100,6 +154,9 @@ class Developer(Employee):
 
 
 class SalesRepresentative(Employee):
+    role = "Sales Representative"
+    __slots__ = ("_commission_rate", "_sales_volume")
+
     def __init__(self, emp_id, name, email, base_salary, commission_rate, sales_volume):
         super().__init__(emp_id, name, email)
         self._base_salary = base_salary
@@ -114,6 +171,7 @@ class SalesRepresentative(Employee):
     def commission_rate(self, value):
         if 0 <= value <= 100:
             self._commission_rate = value
+            self._inputs_changed()
         else:
             raise ValueError("Commission rate must be between 0 and 100")
 
@@ -125,6 +183,7 @@ class SalesRepresentative(Employee):
     def sales_volume(self, value):
         if value >= 0:
             self._sales_volume = value
+            self._inputs_changed()
         else:
             raise ValueError("Sales volume must be non-negative")
 
@@ -136,11 +195,27 @@ class SalesRepresentative(Employee):
 class EmployeeManagementSystem:
     def __init__(self):
         self._employees = {}
+        self._ids_by_role = {}  # role -> set of employee IDs
+        self._ids_by_band = {}  # salary band -> set of employee IDs
+        self._band_of = {}  # employee ID -> the band it is filed under
+        # Developers sorted by overtime, as two lists that line up: the hours
+        # and the IDs. _overtime_of remembers where each one was filed.
+        self._overtime_hours = []
+        self._overtime_ids = []
+        self._overtime_of = {}
+        # Employees whose salary or overtime changed since they were filed.
+        # They are filed again just before the next query that needs it.
+        self._stale = set()
 
     def add_employee(self, employee):
         if isinstance(employee, Employee):
-            employee.calculate_salary()  # Calculate salary when adding employee
+            old = self._employees.get(employee.emp_id)
+            if old is not None:
+                self._unindex(old)
             self._employees[employee.emp_id] = employee
+            self._ids_by_role.setdefault(employee.role, set()).add(employee.emp_id)
+            employee._watcher = self
+            self._stale.add(employee.emp_id)
             print(f"Employee {employee.name} added successfully.")
         else:
             raise TypeError("Invalid employee type")
@@ -148,26 +223,125 @@ class EmployeeManagementSystem:
     def remove_employee(self, emp_id):
         if emp_id in self._employees:
             employee = self._employees.pop(emp_id)
+            self._unindex(employee)
             print(f"Employee {employee.name} removed successfully.")
         else:
             print("Employee not found.")
 
+    def employee_changed(self, employee):
+        self._stale.add(employee.emp_id)
+
+    def _unindex(self, employee):
+        employee._watcher = None
+        ids = self._ids_by_role[employee.role]
+        ids.discard(employee.emp_id)
+        if not ids:
+            del self._ids_by_role[employee.role]
+        self._stale.discard(employee.emp_id)
+        self._unfile(employee.emp_id)
+
+    def _unfile(self, emp_id):
+        band = self._band_of.pop(emp_id, None)
+        if band is not None:
+            self._ids_by_band[band].discard(emp_id)
+            if not self._ids_by_band[band]:
+                del self._ids_by_band[band]
+        hours = self._overtime_of.pop(emp_id, None)
+        if hours is not None:
+            start = bisect_left(self._overtime_hours, hours)
+            end = bisect_right(self._overtime_hours, hours)
+            index = self._overtime_ids.index(emp_id, start, end)
+            del self._overtime_hours[index]
+            del self._overtime_ids[index]
+
+    def _file(self, employee):
+        band = int(employee.salary // SALARY_BAND)
+        self._ids_by_band.setdefault(band, set()).add(employee.emp_id)
+        self._band_of[employee.emp_id] = band
+        if isinstance(employee, Developer):
+            hours = employee.overtime_hours
+            index = bisect_right(self._overtime_hours, hours)
+            self._overtime_hours.insert(index, hours)
+            self._overtime_ids.insert(index, employee.emp_id)
+            self._overtime_of[employee.emp_id] = hours
+
+    def _refresh(self):
+        if len(self._stale) > 1000:
+            # After a big load, sorting everything once beats inserting one
+            # by one into the middle of long lists
+            self._rebuild_indexes()
+            return
+        for emp_id in self._stale:
+            self._unfile(emp_id)
+            self._file(self._employees[emp_id])
+        self._stale.clear()
+
+    def _rebuild_indexes(self):
+        ids_by_band, band_of = {}, {}
+        for emp_id, employee in self._employees.items():
+            band = int(employee.salary // SALARY_BAND)
+            ids_by_band.setdefault(band, set()).add(emp_id)
+            band_of[emp_id] = band
+        self._ids_by_band, self._band_of = ids_by_band, band_of
+        employees = self._employees
+        developers = self._ids_by_role.get(Developer.role, ())
+        filed = sorted(
+            (employees[emp_id]._overtime_hours, emp_id) for emp_id in developers
+        )
+        self._overtime_hours = [hours for hours, _ in filed]
+        self._overtime_ids = [emp_id for _, emp_id in filed]
+        self._overtime_of = dict(zip(self._overtime_ids, self._overtime_hours))
+        self._stale.clear()
+
+    def employees_with_role(self, role):
+        return [self._employees[emp_id] for emp_id in self._ids_by_role.get(role, ())]
+
+    def top_earners(self, count):
+        # Only the highest salary bands are read, and a heap picks the top
+        # earners from them
+        self._refresh()
+        candidates = []
+        for band in sorted(self._ids_by_band, reverse=True):
+            candidates.extend(self._ids_by_band[band])
+            if len(candidates) >= count:
+                break
+        employees = (self._employees[emp_id] for emp_id in candidates)
+        return nlargest(count, employees, key=lambda employee: employee.salary)
+
+    def employees_earning_between(self, low, high):
+        self._refresh()
+        found = []
+        for band in range(int(low // SALARY_BAND), int(high // SALARY_BAND) + 1):
+            for emp_id in self._ids_by_band.get(band, ()):
+                employee = self._employees[emp_id]
+                if low <= employee.salary <= high:
+                    found.append(employee)
+        return found
+
+    def developers_with_overtime_over(self, hours):
+        self._refresh()
+        start = bisect_right(self._overtime_hours, hours)
+        return [self._employees[emp_id] for emp_id in self._overtime_ids[start:]]
+
     def get_employee(self, emp_id):
-        employee = self._employees.get(emp_id)
-        if employee:
-            employee.calculate_salary()  # Recalculate salary when viewing employee
-        return employee
+        # The salary is worked out when it is first read, and kept after that
+        return self._employees.get(emp_id)
 
     def list_employees(self):
         for employee in self._employees.values():
-            employee.calculate_salary()  # Recalculate salary for each employee
-            print(employee)
+            print(employee)  # Only salaries whose inputs changed are recalculated
 
     def calculate_salaries(self):
         for employee in self._employees.values():
-            employee.calculate_salary()
+            employee.salary  # Works out the salaries that are out of date
         print("All salaries calculated.")
 
+    def run_payroll(self):
+        engine = PayrollEngine()
+        for employee in self._employees.values():
+            engine.add(employee)
+        return engine.run()
+
 
 def get_float_input(prompt):
     while True:
@@ -189,7 +363,10 @@ def main():
         print("3. View Employee")
         print("4. List All Employees")
         print("5. Calculate Salaries")
-        print("6. Exit")
+        print("6. Run Payroll")
+        print("7. Top Earners")
+        print("8. Developers With Overtime")
+        print("9. Exit")
         print()
 
         choice = input("Enter your choice: ")
@@ -242,6 +419,22 @@ def main():
             ems.list_employees()  # Show the updated salaries
 
         elif choice == "6":
+            register = ems.run_payroll()
+            for role, cents in register.totals_by_role().items():
+                print(f"{role}: ${cents / 100:,.2f}")
+            print(f"Total payroll: ${register.total_cents() / 100:,.2f}")
+
+        elif choice == "7":
+            count = int(get_float_input("How many top earners: "))
+            for employee in ems.top_earners(count):
+                print(employee)
+
+        elif choice == "8":
+            hours = get_float_input("Show developers with overtime over (hours): ")
+            for employee in ems.developers_with_overtime_over(hours):
+                print(f"{employee}, Overtime: {employee.overtime_hours} hours")
+
+        elif choice == "9":
             print("Thank you for using the Employee Management System. Goodbye!")
             break
 
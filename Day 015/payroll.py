@@ -0,0 +1,149 @@
+from array import array
+from decimal import ROUND_HALF_EVEN, Decimal
+
+HOURS_PER_MONTH = 160
+
+
+def to_hundredths(value):
+    # Dollars to cents, percentages to hundredths of a percent and hours to
+    # hundredths of an hour, rounding halves to even
+    hundredths = Decimal(str(value)) * 100
+    return int(hundredths.to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def base_plus_share(bases, amounts, parts, whole):
+    # bases[i] + amounts[i] * parts[i] / whole for every i, with the share
+    # rounded to the nearest cent (halves up), in one pass over the columns
+    half = whole // 2
+    return array(
+        "q",
+        [
+            base + (amount * part + half) // whole
+            for base, amount, part in zip(bases, amounts, parts)
+        ],
+    )
+
+
+class ManagerColumns:
+    role = "Manager"
+
+    def __init__(self):
+        self.ids = []
+        self.base = array("q")  # cents
+        self.bonus = array("q")  # hundredths of a percent
+
+    def add(self, emp_id, base_salary, bonus_percentage):
+        self.ids.append(emp_id)
+        self.base.append(to_hundredths(base_salary))
+        self.bonus.append(to_hundredths(bonus_percentage))
+
+    def add_employee(self, employee):
+        self.add(employee.emp_id, employee.base_salary, employee.bonus_percentage)
+
+    def salaries(self):
+        return base_plus_share(self.base, self.base, self.bonus, 100 * 100)
+
+
+class DeveloperColumns:
+    role = "Developer"
+
+    def __init__(self):
+        self.ids = []
+        self.base = array("q")  # cents
+        self.overtime = array("q")  # hundredths of an hour
+
+    def add(self, emp_id, base_salary, overtime_hours):
+        self.ids.append(emp_id)
+        self.base.append(to_hundredths(base_salary))
+        self.overtime.append(to_hundredths(overtime_hours))
+
+    def add_employee(self, employee):
+        self.add(employee.emp_id, employee.base_salary, employee.overtime_hours)
+
+    def salaries(self):
+        whole = HOURS_PER_MONTH * 100
+        return base_plus_share(self.base, self.base, self.overtime, whole)
+
+
+class SalesColumns:
+    role = "Sales Representative"
+
+    def __init__(self):
+        self.ids = []
+        self.base = array("q")  # cents
+        self.commission = array("q")  # hundredths of a percent
+        self.sales = array("q")  # cents
+
+    def add(self, emp_id, base_salary, commission_rate, sales_volume):
+        self.ids.append(emp_id)
+        self.base.append(to_hundredths(base_salary))
+        self.commission.append(to_hundredths(commission_rate))
+        self.sales.append(to_hundredths(sales_volume))
+
+    def add_employee(self, employee):
+        self.add(
+            employee.emp_id,
+            employee.base_salary,
+            employee.commission_rate,
+            employee.sales_volume,
+        )
+
+    def salaries(self):
+        return base_plus_share(self.base, self.sales, self.commission, 100 * 100)
+
+
+class PayrollRegister:
+    """The result of a payroll run: IDs and salaries in cents, role by role.
+
+    Nothing is made per employee. Iterating gives (emp_id, role, cents)
+    tuples one at a time.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups  # (role, IDs, salaries in cents)
+
+    def __len__(self):
+        return sum(len(ids) for _, ids, _ in self.groups)
+
+    def __iter__(self):
+        for role, ids, salaries in self.groups:
+            for emp_id, cents in zip(ids, salaries):
+                yield emp_id, role, cents
+
+    def totals_by_role(self):
+        return {role: sum(salaries) for role, _, salaries in self.groups}
+
+    def total_cents(self):
+        return sum(self.totals_by_role().values())
+
+
+class PayrollEngine:
+    """Runs payroll over column arrays, one group per employee type.
+
+    Inputs are kept in whole hundredths (cents, hundredths of a percent or of
+    an hour), so each group's salaries come from one integer expression over
+    its columns, with no floating-point drift and no method call per employee.
+    """
+
+    def __init__(self):
+        self.managers = ManagerColumns()
+        self.developers = DeveloperColumns()
+        self.sales = SalesColumns()
+        self.groups = {
+            columns.role: columns
+            for columns in (self.managers, self.developers, self.sales)
+        }
+
+    def add(self, employee):
+        # Copies one employee's inputs into the columns for its role
+        columns = self.groups.get(getattr(employee, "role", None))
+        if columns is None:
+            raise TypeError("Invalid employee type")
+        columns.add_employee(employee)
+
+    def run(self):
+        groups = [
+            (columns.role, columns.ids, columns.salaries())
+            for columns in self.groups.values()
+        ]
+        return PayrollRegister(groups)